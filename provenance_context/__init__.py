@@ -1,18 +1,276 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
+import os
+import posixpath
+import sys
+import threading
+import warnings
+from collections import ChainMap, OrderedDict, defaultdict
 
 # PIL.Image was imported but never used - removed
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import repeat
 from pathlib import Path
-from typing import Any
+from types import FrameType, MappingProxyType
+from typing import Any, ClassVar
 
 try:
-    # Official toon-python package
-    from toon_format import encode as toon_encode
+    # Faster parsing for large ro-crate-metadata.json files
+    from orjson import loads as _json_loads
 except ImportError:
-    toon_encode = None
+    from json import loads as _json_loads
+
+# Media types by lower-cased file extension, for guess_media_type
+_MEDIA_TYPES_BY_SUFFIX: dict[str, str] = {
+    ".csv": "text/csv",
+    ".json": "application/json",
+    ".geojson": "application/geo+json",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Reasonable TOON defaults for LLM prompts, shared by every `to_toon` call
+# (treat as read-only):
+# - 2-space indent
+# - comma delimiter
+# - no length marker (keep it visually simple)
+_DEFAULT_TOON_OPTIONS: dict[str, Any] = {"indent": 2, "delimiter": ",", "lengthMarker": ""}
+
+# Entity kinds that actions' inputs/outputs are partitioned by, in priority
+# order for entities that carry more than one of these types
+_ENTITY_KINDS = ("File", "Dataset", "PropertyValue")
+
+# Shared type set for entities without an @type
+_EMPTY_TYPES: frozenset[str] = frozenset()
+
+# Lineage note for Files that no CreateAction lists as a result
+_NO_PRODUCER_NOTE = "No CreateAction found that lists this file in its result."
+
+
+# Optional dependencies, imported on first use and cached here
+_toon_encode: Callable[..., str] | None = None
+_toon_missing = False
+_pd: Any = None
+
+
+def _get_toon_encode() -> Callable[..., str] | None:
+    """Return `toon_format.encode`, or None if toon_format is not installed."""
+    global _toon_encode, _toon_missing
+    if _toon_encode is None and not _toon_missing:
+        try:
+            # Official toon-python package
+            from toon_format import encode
+        except ImportError:
+            # Remember the miss so later calls don't search sys.path again
+            _toon_missing = True
+            return None
+        _toon_encode = encode
+    return _toon_encode
+
+
+def _get_pandas() -> Any:
+    """Return the pandas module, importing it on first use."""
+    global _pd
+    if _pd is None:
+        import pandas
+
+        _pd = pandas
+    return _pd
+
+
+def _classify(tset: frozenset[str]) -> str | None:
+    """Return the first of `_ENTITY_KINDS` in a type set, or None."""
+    for kind in _ENTITY_KINDS:
+        if kind in tset:
+            return kind
+    return None
+
+
+def _freeze(index: Mapping[str, list[str]]) -> Mapping[str, tuple[str, ...]]:
+    """Return a read-only view of a staging index with tuple values."""
+    return MappingProxyType({k: tuple(v) for k, v in index.items()})
+
+
+def _columns(rows: Iterable[Mapping[str, Any]]) -> dict[str, list[Any]]:
+    """
+    Turn summary rows into one list per key (keys in first-seen order).
+
+    Rows missing a key get None in that column, so File and Dataset
+    summaries can share one table.
+    """
+    rows = list(rows)
+    keys = dict.fromkeys(key for row in rows for key in row)
+    return {key: [row.get(key) for row in rows] for key in keys}
+
+
+def _ref_ids(refs: Iterable[Any]) -> list[str]:
+    """Return the non-empty string ids of `{"@id": ...}` dicts or bare ids."""
+    ids = [ref.get("@id") if isinstance(ref, dict) else ref for ref in refs]
+    return [rid for rid in ids if isinstance(rid, str) and rid]
+
+
+# Parts of a query record built per record rather than shared per crate
+_RECORD_PARTS = ("inputs", "outputs", "site_ids")
+
+
+def _copy_record(record: dict[str, Any]) -> dict[str, Any]:
+    """
+    Copy a record built by one query (action record, step run, lineage entry).
+
+    Its input/output partitions, site_ids list and nested producer record
+    are copied too; the summaries inside stay shared.
+    """
+    copied = record.copy()
+    for key in _RECORD_PARTS:
+        value = copied.get(key)
+        if value is not None:
+            copied[key] = value.copy()
+    produced_by = copied.get("produced_by")
+    if produced_by is not None:
+        copied["produced_by"] = _copy_record(produced_by)
+    return copied
+
+
+def _warn_truncated(max_depth: float | None) -> None:
+    """
+    Warn that a walk stopped at the default depth cap.
+
+    The warning is attributed to the first caller outside this module, so
+    the "once per location" filter keys on user code rather than on a
+    line in here that every truncated walk would share.
+    """
+    stacklevel = 1
+    frame: FrameType | None = sys._getframe(0)
+    while frame is not None and frame.f_globals.get("__name__") == __name__:
+        frame = frame.f_back
+        stacklevel += 1
+    warnings.warn(
+        f"Provenance walk stopped at the default max_depth={max_depth}; "
+        "pass a larger max_depth (or float('inf')) for the full graph",
+        RuntimeWarning,
+        stacklevel=stacklevel,
+    )
+
+
+def _trigrams(text: str) -> set[str]:
+    """Return the set of length-3 substrings of `text`."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _walk_actions(
+    frontier: list[int],
+    max_depth: float | None,
+    entity_actions: Mapping[int, tuple[int, ...]],
+    action_entities: Mapping[int, tuple[int, ...]],
+    iloc_to_id: list[str],
+    data_summary: Mapping[int, dict[str, Any]],
+    action_record: Callable[[str], dict[str, Any]],
+    entity_edges: Mapping[int, tuple[dict[str, str], ...]],
+    action_edges: Mapping[int, tuple[dict[str, str], ...]],
+    on_truncated: Callable[[], object] | None = None,
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """
+    Level-by-level walk over the integer action graph, shared by the
+    ancestry and descendant queries.
+
+    `entity_actions` maps a File/Dataset iloc to the actions next to it in
+    the walk direction, and `action_entities` maps an action iloc to the
+    File/Dataset ilocs it leads on to. `entity_edges` and `action_edges`
+    hold the prebuilt edge records for those two hops, position for
+    position. Yields ("entity", ...), ("action", ...) and
+    ("edge", ...) records as described in `ProvenanceCrate.iter_ancestry`.
+
+    `on_truncated` is called once, the first time `max_depth` stops the
+    walk short of unvisited entities.
+    """
+    # Visited flags indexed by iloc; the frontier is expanded one depth level at a time.
+    # Entities are marked when queued, so each appears in at most one frontier.
+    visited_entities = bytearray(len(iloc_to_id))
+    visited_actions = bytearray(len(iloc_to_id))
+    depth = 0
+
+    queued: list[int] = []
+    for ent_i in frontier:
+        if not visited_entities[ent_i]:
+            visited_entities[ent_i] = 1
+            queued.append(ent_i)
+    frontier = queued
+
+    while frontier:
+        next_frontier: list[int] = []
+        expand = max_depth is None or depth + 1 <= max_depth
+
+        for ent_i in frontier:
+            yield "entity", data_summary[ent_i]
+
+            for act_i, edge in zip(entity_actions.get(ent_i, ()), entity_edges.get(ent_i, ())):
+                # Always record the entity-action edge
+                yield "edge", edge
+
+                # An action seen before has already had its entities queued
+                if visited_actions[act_i]:
+                    continue
+                visited_actions[act_i] = 1
+
+                yield "action", action_record(iloc_to_id[act_i])
+
+                # Continue into the action's file/dataset inputs or outputs
+                next_ilocs = action_entities[act_i]
+                for edge in action_edges[act_i]:
+                    yield "edge", edge
+                if expand:
+                    for next_i in next_ilocs:
+                        if not visited_entities[next_i]:
+                            visited_entities[next_i] = 1
+                            next_frontier.append(next_i)
+                elif on_truncated is not None and any(not visited_entities[i] for i in next_ilocs):
+                    on_truncated()
+                    on_truncated = None
+
+        frontier = next_frontier
+        depth += 1
 
-import json
+
+class _LRUCache:
+    """
+    A dict-like memo that keeps at most `maxsize` entries.
+
+    The least recently read or written entry is dropped first. A lock keeps
+    it consistent when `to_toon_many_file_lineages` fills it from threads.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[Any, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Any) -> Any:
+        """Return the entry for `key` (marking it recently used), or None."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
 
 
 class ProvenanceCrate:
@@ -30,6 +288,9 @@ class ProvenanceCrate:
     - Can resolve File entities to local paths (for CSVs, images, etc.)
     - Can emit TOON-encoded summaries for LLM prompts.
 
+    Entity summaries and edge records are built once per crate and shared
+    between query results, so treat returned dicts as read-only.
+
     Typical usage:
 
         crate = ProvenanceCrate.from_dir("med_prov.crate")
@@ -43,6 +304,15 @@ class ProvenanceCrate:
         path = crate.get_local_path(lineage[0]["file"]["id"])
     """
 
+    # Depth used by the ancestry/descendant walks when max_depth is None.
+    # Deeply nested workflows can otherwise pull in most of the crate;
+    # pass max_depth=float("inf") (or set this to None) to walk everything.
+    DEFAULT_MAX_DEPTH: ClassVar[float | None] = 50
+
+    # Entries kept by each memo of query results / TOON output (see
+    # _invalidate_caches); the least recently used entry is dropped first.
+    CACHE_SIZE: ClassVar[int] = 256
+
     # ------------------------------------------------------------------
     # Construction / loading
     # ------------------------------------------------------------------
@@ -62,10 +332,48 @@ class ProvenanceCrate:
         """
         self.graph = graph
         self.root_dir: Path | None = Path(root_dir) if root_dir else None
-        self.by_id: dict[str, dict[str, Any]] = {}
+        self.by_id: Mapping[str, dict[str, Any]] = {}
+        self.types_by_id: Mapping[str, frozenset[str]] = {}
+        self._kind_by_id: dict[str, str] = {}
+        self.ids_by_type: Mapping[str, tuple[str, ...]] = {}
+        self.altname_to_fids: Mapping[str, tuple[str, ...]] = {}
+        self._altname_indexes: dict[str, tuple[Mapping[str, tuple[str, ...]], tuple[str, ...]]] = {}
+        self._file_summary: dict[str, dict[str, Any]] = {}
+        self._dataset_summary: dict[str, dict[str, Any]] = {}
+        self._param_summary: dict[str, dict[str, Any]] = {}
+        self._action_summary: dict[str, dict[str, Any]] = {}
+        self._file_media_types: dict[str, str | None] = {}
         self.actions: list[dict[str, Any]] = []
-        self.actions_by_result: dict[str, list[str]] = {}
-        self.actions_by_input: dict[str, list[str]] = {}
+        self.actions_by_id: Mapping[str, dict[str, Any]] = {}
+        self.tool_by_action: Mapping[str, dict[str, Any] | None] = {}
+        self._action_tool_summary: dict[str, dict[str, Any] | None] = {}
+        self.actions_by_result: Mapping[str, tuple[str, ...]] = {}
+        self.actions_by_input: Mapping[str, tuple[str, ...]] = {}
+        self._action_inputs: Mapping[str, MappingProxyType[str, tuple[dict[str, Any], ...]]] = {}
+        self._action_outputs: Mapping[str, MappingProxyType[str, tuple[dict[str, Any], ...]]] = {}
+        self._action_site_ids: Mapping[str, tuple[Any, ...]] = {}
+        self.actions_by_site_id: Mapping[str, tuple[str, ...]] = {}
+        self._params_by_site_id: Mapping[str, tuple[str, ...]] = {}
+        self.id_to_iloc: dict[str, int] = {}
+        self.iloc_to_id: list[str] = []
+        self._data_summary_iloc: dict[int, dict[str, Any]] = {}
+        self._producers_iloc: dict[int, tuple[int, ...]] = {}
+        self._consumers_iloc: dict[int, tuple[int, ...]] = {}
+        self._action_data_inputs: dict[int, tuple[int, ...]] = {}
+        self._action_data_outputs: dict[int, tuple[int, ...]] = {}
+        self._producer_edges: dict[int, tuple[dict[str, str], ...]] = {}
+        self._consumer_edges: dict[int, tuple[dict[str, str], ...]] = {}
+        self._action_input_edges: dict[int, tuple[dict[str, str], ...]] = {}
+        self._action_output_edges: dict[int, tuple[dict[str, str], ...]] = {}
+        self._walk_graph_ready = False
+        self._walk_graph_lock = threading.Lock()
+        # Listing of root_dir, and the linked directories it skipped
+        self._fs_paths: tuple[frozenset[str], frozenset[str]] | None = None
+        self._toon_cache = _LRUCache(self.CACHE_SIZE)
+        # Walk results, keyed by _walk_key, with whether the default cap cut them short
+        self._ancestry_cache = _LRUCache(self.CACHE_SIZE)
+        self._descendants_cache = _LRUCache(self.CACHE_SIZE)
+        self._site_cache = _LRUCache(self.CACHE_SIZE)
         self._build_indexes()
 
     @classmethod
@@ -83,26 +391,28 @@ class ProvenanceCrate:
         ProvenanceCrate
             An instance with indexes ready for lineage queries, with
             root_dir set to the parent directory of the metadata file.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the metadata file does not exist.
         """
-        metadata_path = Path(metadata_path)
-        with metadata_path.open("r", encoding="utf-8") as f:
-            meta = json.load(f)
+        path = Path(metadata_path)
+        # One read of the whole file, with no separate exists() check: a
+        # missing file raises FileNotFoundError from the read itself.
+        # orjson (if installed) parses the bytes directly.
+        meta = _json_loads(path.read_bytes())
         graph = meta["@graph"]
-        root_dir = metadata_path.parent
+        root_dir = path.parent
         return cls(graph, root_dir=str(root_dir))
 
     @classmethod
     def from_dir(cls, crate_dir: str) -> ProvenanceCrate:
         """
         Load a crate from its directory, assuming `ro-crate-metadata.json`
-        is at the root.
+        is at the root. Raises FileNotFoundError if it is missing.
         """
-        crate_dir = Path(crate_dir)
-        metadata_path = crate_dir / "ro-crate-metadata.json"
-        with metadata_path.open("r", encoding="utf-8") as f:
-            meta = json.load(f)
-        graph = meta["@graph"]
-        return cls(graph, root_dir=str(crate_dir))
+        return cls.from_file(str(Path(crate_dir) / "ro-crate-metadata.json"))
 
     # ------------------------------------------------------------------
     # Internal helpers / indexes
@@ -113,32 +423,362 @@ class ProvenanceCrate:
         Build lookup structures over the crate:
 
         - by_id: @id -> entity
+        - types_by_id: @id -> frozenset of @type names
+        - _kind_by_id: @id -> "File" / "Dataset" / "PropertyValue" (first match)
+        - ids_by_type: @type name -> [@id] of entities with that type
+        - altname_to_fids: File.alternateName -> [File.id]
+        - _altname_indexes: "File" / "Dataset" -> trigram index of that
+          type's string alternateNames, plus the ids whose alternateName is
+          set but not a string; filled by `_altname_index` on first use
+        - _file_summary / _dataset_summary / _param_summary / _action_summary:
+          @id -> precomputed summary dict for entities of that type
+        - _file_media_types: File.id -> media type from `guess_media_type`
         - actions: list of CreateAction entities
+        - actions_by_id: CreateAction.id -> CreateAction entity
+        - tool_by_action: CreateAction.id -> instrument entity (or None)
+        - _action_tool_summary: CreateAction.id -> shared instrument summary
         - actions_by_result: entity_id -> [CreateAction.id] that generate it
         - actions_by_input:  entity_id -> [CreateAction.id] that use it
+        - _action_inputs / _action_outputs: CreateAction.id -> read-only
+          partitioned object / result summaries (query results get a dict copy)
+        - _action_site_ids: CreateAction.id -> values of its site_id parameters
+          (query results get a list copy)
+        - actions_by_site_id: site_id value -> [CreateAction.id] tagged with it
+        - _params_by_site_id: site_id value -> [PropertyValue.id] named "site_id"
+        - id_to_iloc / iloc_to_id: dense integer position of every @id
+        - _data_summary_iloc: File/Dataset iloc -> its summary (File wins)
+        - _producers_iloc / _consumers_iloc: File/Dataset iloc -> tuple of
+          action ilocs that generate / use it (integer form of actions_by_*)
+        - _action_data_inputs / _action_data_outputs: action iloc -> tuple of
+          File/Dataset ilocs it uses / generates (files first, then datasets)
+        - _producer_edges / _consumer_edges / _action_input_edges /
+          _action_output_edges: the edge records for each entry of the four
+          iloc indexes above, one shared dict per (type, action, entity)
+
+        The iloc indexes from _data_summary_iloc on, and the trigram indexes,
+        are filled on first use by `_build_walk_graph` / `_altname_index`.
+
+        The public indexes are read-only mappings with tuple values; call
+        this method again after editing `graph` to rebuild them. Raises
+        ValueError if two entities share an @id.
+
+        @id and @type strings are interned, so the index keys and the ids
+        stored in other indexes are shared objects and compare by identity.
         """
-        self.by_id = {e["@id"]: e for e in self.graph}
-        self.actions = [e for e in self.graph if self._has_type(e, "CreateAction")]
+        intern = sys.intern
+        self.by_id = by_id = MappingProxyType({intern(e["@id"]): e for e in self.graph})
+        if len(by_id) != len(self.graph):
+            # Only pay for finding the offender when there is one
+            seen: set[str] = set()
+            for e in self.graph:
+                if e["@id"] in seen:
+                    raise ValueError(f"Duplicate @id in crate graph: {e['@id']!r}")
+                seen.add(e["@id"])
+
+        types_by_id: dict[str, frozenset[str]] = {}
+        ids_by_type: dict[str, list[str]] = defaultdict(list)
+        kind_by_id: dict[str, str] = {}
+        for eid, e in by_id.items():
+            t = e.get("@type")
+            if isinstance(t, list):
+                tset = frozenset(map(intern, t))
+            elif t:
+                tset = frozenset((intern(t),))
+            else:
+                tset = _EMPTY_TYPES
+            types_by_id[eid] = tset
+            for tname in tset:
+                ids_by_type[tname].append(eid)
+            kind = _classify(tset)
+            if kind is not None:
+                kind_by_id[eid] = kind
+
+        self.types_by_id = MappingProxyType(types_by_id)
+        self._kind_by_id = kind_by_id
+        self.ids_by_type = type_ids = _freeze(ids_by_type)
+
+        # Per-action indexes are keyed by the interned ids from by_id
+        action_ids = type_ids.get("CreateAction", ())
+        self.actions_by_id = MappingProxyType({aid: by_id[aid] for aid in action_ids})
+        self.actions = list(self.actions_by_id.values())
+
+        tool_by_action = {
+            aid: self._resolve_ref(by_id[aid].get("instrument")) for aid in action_ids
+        }
+        self.tool_by_action = MappingProxyType(tool_by_action)
+
+        # Tools are shared by many actions, so summarise each one once
+        tool_summaries = {
+            tool["@id"]: self._summarise_tool(tool) for tool in tool_by_action.values() if tool
+        }
+        self._action_tool_summary = {
+            aid: tool_summaries[tool["@id"]] if tool else None
+            for aid, tool in tool_by_action.items()
+        }
+
+        altname_to_fids: dict[str, list[str]] = defaultdict(list)
+        for fid in type_ids.get("File", ()):
+            alt = by_id[fid].get("alternateName")
+            if isinstance(alt, str):
+                altname_to_fids[alt].append(fid)
+        self.altname_to_fids = _freeze(altname_to_fids)
+
+        # Trigram indexes are built by the first substring lookup
+        self._altname_indexes = {}
+
+        self._file_summary = {
+            eid: self._summarise_file(by_id[eid]) for eid in type_ids.get("File", ())
+        }
+        self._dataset_summary = {
+            eid: self._summarise_dataset(by_id[eid]) for eid in type_ids.get("Dataset", ())
+        }
+        self._param_summary = {
+            eid: self._summarise_param(by_id[eid]) for eid in type_ids.get("PropertyValue", ())
+        }
+        self._action_summary = {
+            eid: self._summarise_action(by_id[eid]) for eid in type_ids.get("CreateAction", ())
+        }
+        # Media types repeat across many files, so intern them like @type
+        media_types: dict[str, str | None] = {}
+        for fid, summary in self._file_summary.items():
+            mt: str | None = self.guess_media_type(summary)
+            media_types[fid] = intern(mt) if isinstance(mt, str) else mt
+        self._file_media_types = media_types
 
         actions_by_result: dict[str, list[str]] = defaultdict(list)
         actions_by_input: dict[str, list[str]] = defaultdict(list)
 
-        for act in self.actions:
-            act_id = act["@id"]
-            for key, index in (("result", actions_by_result), ("object", actions_by_input)):
-                for obj in act.get(key, []):
-                    oid = obj.get("@id") if isinstance(obj, dict) else obj
-                    if oid:
-                        index[oid].append(act_id)
+        for act_id, act in self.actions_by_id.items():
+            for rid in _ref_ids(act.get("result", ())):
+                actions_by_result[intern(rid)].append(act_id)
+            for oid in _ref_ids(act.get("object", ())):
+                actions_by_input[intern(oid)].append(act_id)
 
-        self.actions_by_result = dict(actions_by_result)
-        self.actions_by_input = dict(actions_by_input)
+        self.actions_by_result = _freeze(actions_by_result)
+        self.actions_by_input = _freeze(actions_by_input)
+
+        self._action_inputs = MappingProxyType(
+            {
+                aid: MappingProxyType(
+                    self._partition_refs(by_id[aid].get("object", []), with_parameters=True)
+                )
+                for aid in action_ids
+            }
+        )
+        self._action_outputs = MappingProxyType(
+            {
+                aid: MappingProxyType(self._partition_refs(by_id[aid].get("result", [])))
+                for aid in action_ids
+            }
+        )
+        self._action_site_ids = MappingProxyType(
+            {
+                aid: tuple([p["value"] for p in inputs["parameters"] if p.get("name") == "site_id"])
+                for aid, inputs in self._action_inputs.items()
+            }
+        )
+
+        actions_by_site_id: dict[str, list[str]] = defaultdict(list)
+        for act_id, site_ids in self._action_site_ids.items():
+            for sid in dict.fromkeys(s for s in site_ids if isinstance(s, str)):
+                actions_by_site_id[sid].append(act_id)
+
+        self.actions_by_site_id = _freeze(actions_by_site_id)
+
+        params_by_site_id: dict[str, list[str]] = defaultdict(list)
+        for pid in type_ids.get("PropertyValue", ()):
+            param = by_id[pid]
+            value = param.get("value")
+            if param.get("name") == "site_id" and isinstance(value, str):
+                params_by_site_id[value].append(pid)
+        self._params_by_site_id = _freeze(params_by_site_id)
+
+        # Integer form of the action graph, used by the ancestry/descendant walks
+        self.iloc_to_id = list(self.by_id)
+        self.id_to_iloc = {eid: i for i, eid in enumerate(self.iloc_to_id)}
+        # The iloc adjacency and edge records below are built by the first walk
+        self._walk_graph_ready = False
+
+        # Files may have changed alongside the graph
+        self.refresh_fs_index()
+        self._invalidate_caches()
+
+    def _build_walk_graph(self) -> None:
+        """
+        Build the integer action graph and edge records the walks use.
+
+        Only the ancestry/descendant walks need these tables, so they are
+        built by the first walk rather than at load time. The lock keeps a
+        concurrent walk from seeing half-built tables.
+        """
+        with self._walk_graph_lock:
+            if self._walk_graph_ready:
+                return
+            id_to_iloc = self.id_to_iloc
+            # The walks only ever visit data artefacts, so other entities are
+            # left out here rather than rejected each time they are dequeued
+            data_summary = {id_to_iloc[eid]: s for eid, s in self._dataset_summary.items()}
+            data_summary.update((id_to_iloc[eid], s) for eid, s in self._file_summary.items())
+            self._data_summary_iloc = data_summary
+            self._producers_iloc = {
+                id_to_iloc[eid]: tuple([id_to_iloc[aid] for aid in aids])
+                for eid, aids in self.actions_by_result.items()
+                if id_to_iloc.get(eid) in data_summary
+            }
+            self._consumers_iloc = {
+                id_to_iloc[eid]: tuple([id_to_iloc[aid] for aid in aids])
+                for eid, aids in self.actions_by_input.items()
+                if id_to_iloc.get(eid) in data_summary
+            }
+            self._action_data_inputs = {
+                id_to_iloc[aid]: tuple(
+                    [id_to_iloc[s["id"]] for s in parts["files"] + parts["datasets"]]
+                )
+                for aid, parts in self._action_inputs.items()
+            }
+            self._action_data_outputs = {
+                id_to_iloc[aid]: tuple(
+                    [id_to_iloc[s["id"]] for s in parts["files"] + parts["datasets"]]
+                )
+                for aid, parts in self._action_outputs.items()
+            }
+
+            # Edge records are the same for every walk that crosses them
+            edge_records: dict[tuple[str, int, int], dict[str, str]] = {}
+            iloc_to_id = self.iloc_to_id
+
+            def edges_for(
+                edge_type: str, act_ilocs: Iterable[int], ent_ilocs: Iterable[int]
+            ) -> tuple[dict[str, str], ...]:
+                out = []
+                for act_i, ent_i in zip(act_ilocs, ent_ilocs):
+                    key = (edge_type, act_i, ent_i)
+                    edge = edge_records.get(key)
+                    if edge is None:
+                        edge = edge_records[key] = {
+                            "type": edge_type,
+                            "action": iloc_to_id[act_i],
+                            "entity": iloc_to_id[ent_i],
+                        }
+                    out.append(edge)
+                return tuple(out)
+
+            self._producer_edges = {
+                ent_i: edges_for("generated", acts, repeat(ent_i))
+                for ent_i, acts in self._producers_iloc.items()
+            }
+            self._consumer_edges = {
+                ent_i: edges_for("used", acts, repeat(ent_i))
+                for ent_i, acts in self._consumers_iloc.items()
+            }
+            self._action_input_edges = {
+                act_i: edges_for("used", repeat(act_i), ents)
+                for act_i, ents in self._action_data_inputs.items()
+            }
+            self._action_output_edges = {
+                act_i: edges_for("generated", repeat(act_i), ents)
+                for act_i, ents in self._action_data_outputs.items()
+            }
+            self._walk_graph_ready = True
+
+    def _invalidate_caches(self) -> None:
+        """Drop memoised query results; they refer to the previous indexes."""
+        self._toon_cache.clear()
+        self._ancestry_cache.clear()
+        self._descendants_cache.clear()
+        self._site_cache.clear()
+
+    def _depth_key(self, max_depth: float | None) -> tuple[Any, ...]:
+        """Key a depth limit, resolving None to the current DEFAULT_MAX_DEPTH."""
+        if max_depth is None:
+            return ("default", self.DEFAULT_MAX_DEPTH)
+        return (max_depth,)
+
+    def _walk_key(self, root_ids: list[str], max_depth: float | None) -> tuple[Any, ...]:
+        """Key a walk result by its resolved roots and effective depth limit."""
+        return (tuple(root_ids), *self._depth_key(max_depth))
+
+    @staticmethod
+    def _copy_result(result: dict[str, Any], records: tuple[str, ...] = ()) -> dict[str, Any]:
+        """
+        Copy a memoised query result so callers can edit it.
+
+        Top-level containers are copied, and so are the per-query records
+        held under the `records` keys; the per-crate summaries and edge
+        records stay shared.
+        """
+        copied = {
+            key: value.copy() if isinstance(value, (dict, list)) else value
+            for key, value in result.items()
+        }
+        for key in records:
+            value = copied[key]
+            if isinstance(value, dict):
+                copied[key] = {k: _copy_record(record) for k, record in value.items()}
+            else:
+                copied[key] = [_copy_record(record) for record in value]
+        return copied
+
+    def _resolve_ref(self, ref: Any) -> dict[str, Any] | None:
+        """Return the entity an `{"@id": ...}` dict or bare id refers to, if any."""
+        rid = ref.get("@id") if isinstance(ref, dict) else ref
+        return self.by_id.get(rid) if rid else None
+
+    def _partition_refs(
+        self, refs: list[Any], with_parameters: bool = False
+    ) -> dict[str, tuple[dict[str, Any], ...]]:
+        """
+        Resolve @id references and group their summaries by entity kind.
+
+        Every bucket is returned as a tuple, so the many empty ones are all
+        the shared empty tuple rather than a list per action.
+
+        Parameters
+        ----------
+        refs:
+            A CreateAction's `object` or `result` list (dicts or bare ids).
+        with_parameters:
+            Whether to bucket PropertyValues under "parameters"; otherwise
+            they are listed under "other" like any non-File/Dataset entity.
+        """
+        by_id = self.by_id
+        kind_by_id = self._kind_by_id
+        files: list[dict[str, Any]] = []
+        datasets: list[dict[str, Any]] = []
+        parameters: list[dict[str, Any]] = []
+        other: list[dict[str, Any]] = []
+        for ref in refs:
+            rid = ref.get("@id") if isinstance(ref, dict) else ref
+            if not rid or rid not in by_id:
+                continue
+            kind = kind_by_id.get(rid)
+            if kind == "File":
+                files.append(self._file_summary[rid])
+            elif kind == "Dataset":
+                datasets.append(self._dataset_summary[rid])
+            elif kind == "PropertyValue" and with_parameters:
+                parameters.append(self._param_summary[rid])
+            else:
+                ent = by_id[rid]
+                other.append({"id": ent["@id"], "type": ent.get("@type")})
+
+        if with_parameters:
+            return {
+                "files": tuple(files),
+                "datasets": tuple(datasets),
+                "parameters": tuple(parameters),
+                "other": tuple(other),
+            }
+        return {"files": tuple(files), "datasets": tuple(datasets), "other": tuple(other)}
 
     @staticmethod
     def _has_type(ent: dict[str, Any], tname: str) -> bool:
         """
         Return True if the entity has type `tname` (handles string or list).
 
+        Works on any entity dict; for entities already in the crate,
+        `_is_type` tests the precomputed type set instead.
+
         Parameters
         ----------
         ent:
@@ -151,9 +791,16 @@ class ProvenanceCrate:
             return tname in t
         return t == tname
 
+    def _is_type(self, eid: str, tname: str) -> bool:
+        """Return True if the crate entity `eid` has type `tname` (False if unknown)."""
+        types = self.types_by_id.get(eid)
+        return types is not None and tname in types
+
     # ------------------------------------------------------------------
     # Summariser helpers (used in query outputs)
     # ------------------------------------------------------------------
+    # These run once per entity in _build_indexes; queries hand out the
+    # stored dicts, so they stay plain dicts (JSON/TOON-ready, read-only).
 
     @staticmethod
     def _summarise_file(ent: dict[str, Any]) -> dict[str, Any]:
@@ -196,15 +843,22 @@ class ProvenanceCrate:
 
     @staticmethod
     def _summarise_tool(ent: dict[str, Any] | None) -> dict[str, Any] | None:
-        """Return a compact summary for a SoftwareApplication (or None)."""
+        """
+        Return a compact summary for a SoftwareApplication (or None).
+
+        Input/output lists are copied into tuples, so the summary shared by
+        all of the tool's actions doesn't alias the entity's own lists.
+        """
         if not ent:
             return None
+        inputs = ent.get("input", ())
+        outputs = ent.get("output", ())
         return {
             "id": ent["@id"],
             "name": ent.get("name"),
             "type": ent.get("@type"),
-            "inputs": ent.get("input", []),
-            "outputs": ent.get("output", []),
+            "inputs": tuple(inputs) if isinstance(inputs, list) else inputs,
+            "outputs": tuple(outputs) if isinstance(outputs, list) else outputs,
         }
 
     # ------------------------------------------------------------------
@@ -215,6 +869,9 @@ class ProvenanceCrate:
         """
         Find File entities whose `alternateName` contains a substring.
 
+        Patterns of three or more characters only check the Files sharing
+        the pattern's rarest trigram; shorter patterns scan every File.
+
         Parameters
         ----------
         pattern:
@@ -226,13 +883,79 @@ class ProvenanceCrate:
             Matching File entities from the crate.
         """
         out: list[dict[str, Any]] = []
-        for e in self.graph:
-            if self._has_type(e, "File"):
-                alt = e.get("alternateName", "")
-                if isinstance(alt, str) and pattern in alt:
-                    out.append(e)
+        for fid in self._altname_candidates("File", pattern):
+            e = self.by_id[fid]
+            alt = e.get("alternateName", "")
+            if isinstance(alt, str) and pattern in alt:
+                out.append(e)
         return out
 
+    @property
+    def altname_trigrams(self) -> Mapping[str, tuple[str, ...]]:
+        """Trigram of File.alternateName -> [File.id], built on first use."""
+        return self._altname_index("File")[0]
+
+    def _altname_index(
+        self, type_name: str
+    ) -> tuple[Mapping[str, tuple[str, ...]], tuple[str, ...]]:
+        """
+        Return the trigram index of `type_name`'s string alternateNames and
+        the ids whose alternateName is set but not a string.
+
+        Built on the first substring lookup (file selectors, site ids), so
+        callers that never search by name do not pay for it at load time.
+        """
+        built = self._altname_indexes.get(type_name)
+        if built is None:
+            by_id = self.by_id
+            trigram_ids: dict[str, list[str]] = defaultdict(list)
+            nonstr_ids = []
+            for eid in self.ids_by_type.get(type_name, ()):
+                alt = by_id[eid].get("alternateName")
+                if isinstance(alt, str):
+                    for tri in _trigrams(alt):
+                        trigram_ids[tri].append(eid)
+                elif alt is not None:
+                    nonstr_ids.append(eid)
+            built = (_freeze(trigram_ids), tuple(nonstr_ids))
+            self._altname_indexes[type_name] = built
+        return built
+
+    def _altname_candidates(self, type_name: str, pattern: str) -> Collection[str]:
+        """
+        Return the ids of `type_name` whose string alternateName may contain
+        `pattern`: those sharing its rarest trigram, or all of them when the
+        pattern is shorter than three characters.
+        """
+        if len(pattern) < 3:
+            return self.ids_by_type.get(type_name, ())
+        index = self._altname_index(type_name)[0]
+        buckets: list[tuple[str, ...]] = []
+        for tri in _trigrams(pattern):
+            bucket = index.get(tri)
+            if bucket is None:
+                return ()
+            buckets.append(bucket)
+        return min(buckets, key=len)
+
+    def _ids_mentioning(self, type_name: str, text: str) -> list[str]:
+        """
+        Return the ids of `type_name` whose alternateName, as a string,
+        contains `text`, in crate order.
+        """
+        by_id = self.by_id
+        candidates = self._altname_candidates(type_name, text)
+        nonstr_ids = self._altname_index(type_name)[1]
+        if nonstr_ids and len(text) >= 3:
+            # Non-string names are not in the trigram index; check them too
+            id_to_iloc = self.id_to_iloc
+            candidates = sorted({*candidates, *nonstr_ids}, key=id_to_iloc.__getitem__)
+        return [eid for eid in candidates if text in str(by_id[eid].get("alternateName", ""))]
+
+    def count_by_type(self, type_name: str) -> int:
+        """Return how many entities in the crate have @type `type_name`."""
+        return len(self.ids_by_type.get(type_name, ()))
+
     def get_image_files(self) -> list[dict[str, Any]]:
         """
         Return a list of image files in the crate, based on media type
@@ -247,14 +970,12 @@ class ProvenanceCrate:
             "exampleOfWork": {...}
           }
         """
-        images: list[dict[str, Any]] = []
-        for ent in self.graph:
-            if not self._has_type(ent, "File"):
-                continue
-            summary = self._summarise_file(ent)
-            if self.is_image(summary):
-                images.append(summary)
-        return images
+        media_types = self._file_media_types
+        return [
+            summary
+            for fid, summary in self._file_summary.items()
+            if (media_types[fid] or "").lower().startswith("image/")
+        ]
 
     def get_file_entities(self, file_selector: str) -> list[dict[str, Any]]:
         """
@@ -278,15 +999,11 @@ class ProvenanceCrate:
             Matching File entities; may be empty.
         """
         # Case 1: exact @id
-        ent = self.by_id.get(file_selector)
-        if ent is not None and self._has_type(ent, "File"):
-            return [ent]
+        if self._is_type(file_selector, "File"):
+            return [self.by_id[file_selector]]
 
         # Case 2: exact alternateName
-        vals = list(self.by_id.values())
-        exact = [
-            e for e in vals if self._has_type(e, "File") and e.get("alternateName") == file_selector
-        ]
+        exact = [self.by_id[fid] for fid in self.altname_to_fids.get(file_selector, ())]
         if exact:
             return exact
 
@@ -302,18 +1019,22 @@ class ProvenanceCrate:
         - the file does not have a local path representation
         - the @id/contentUrl looks like a remote IRI or fragment
         - the path does not exist
+
+        Existence is checked against a listing of root_dir taken on first
+        use; call `refresh_fs_index()` if files are added afterwards.
         """
         if self.root_dir is None:
             return None
 
         if isinstance(file, str):
-            ent = self.by_id.get(file)
+            if not self._is_type(file, "File"):
+                return None
+            ent = self.by_id[file]
+        elif not file or not self._has_type(file, "File"):
+            return None
         else:
             ent = file
 
-        if not ent or not self._has_type(ent, "File"):
-            return None
-
         # Prefer contentUrl if present, otherwise use @id
         cid = ent.get("contentUrl") or ent.get("@id")
         if isinstance(cid, dict):
@@ -326,8 +1047,71 @@ class ProvenanceCrate:
         if cid.startswith("#") or "://" in cid:
             return None
 
-        path = self.root_dir / cid
-        return path if path.exists() else None
+        rel = posixpath.normpath(cid)
+        listed, unlisted_dirs = self._fs_listing
+        if rel in listed:
+            return self.root_dir / cid
+
+        # Absolute or escaping paths, and paths through a linked directory the
+        # listing skipped, are outside the listing; stat them directly
+        if (
+            posixpath.isabs(rel)
+            or rel == "."
+            or rel.startswith("../")
+            or any(rel.startswith(d + "/") for d in unlisted_dirs)
+        ):
+            path = self.root_dir / cid
+            return path if path.exists() else None
+        return None
+
+    @property
+    def _fs_listing(self) -> tuple[frozenset[str], frozenset[str]]:
+        """
+        Relative POSIX paths under root_dir, and the linked directories skipped.
+
+        Built with a single directory walk on first use, so `get_local_path`
+        does not need a `stat` call per lookup.
+        """
+        if self._fs_paths is None:
+            self._fs_paths = self._list_root_dir()
+        return self._fs_paths
+
+    def _list_root_dir(self) -> tuple[frozenset[str], frozenset[str]]:
+        """
+        Walk root_dir once and return the paths for `_fs_listing`.
+
+        Symlinked directories are followed, as a per-path exists() check
+        would, but each real directory is walked only once so link cycles
+        end. Links to an already walked directory are returned separately
+        and looked up with `stat` instead.
+        """
+        if self.root_dir is None:
+            return frozenset(), frozenset()
+
+        root = str(self.root_dir)
+        paths: set[str] = set()
+        unlisted_dirs: set[str] = set()
+        seen = {os.path.realpath(root)}
+        for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+            rel_dir = os.path.relpath(dirpath, root)
+            prefix = "" if rel_dir == "." else Path(rel_dir).as_posix() + "/"
+            paths.update(prefix + name for name in dirnames)
+            paths.update(prefix + name for name in filenames)
+
+            keep = []
+            for name in dirnames:
+                real = os.path.realpath(os.path.join(dirpath, name))
+                if real in seen:
+                    unlisted_dirs.add(prefix + name)
+                else:
+                    seen.add(real)
+                    keep.append(name)
+            dirnames[:] = keep
+        return frozenset(paths), frozenset(unlisted_dirs)
+
+    def refresh_fs_index(self) -> None:
+        """Discard the cached listing of root_dir used by `get_local_path`."""
+        self._fs_paths = None
 
     # ---- media type helpers -------------------------------------------------
 
@@ -341,24 +1125,15 @@ class ProvenanceCrate:
         if fmt:
             return fmt
 
-        name = (file_summary.get("name") or "").lower()
-
-        if name.endswith(".csv"):
-            return "text/csv"
-        if name.endswith(".json"):
-            return "application/json"
-        if name.endswith(".geojson"):
-            return "application/geo+json"
-        if name.endswith(".png"):
-            return "image/png"
-        if name.endswith(".jpg") or name.endswith(".jpeg"):
-            return "image/jpeg"
-        if name.endswith(".tif") or name.endswith(".tiff"):
-            return "image/tiff"
-        if name.endswith(".xlsx"):
-            return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        name = file_summary.get("name")
+        if not isinstance(name, str):
+            return None
 
-        return None
+        # Only the last extension counts, so "a.geo.json" is plain JSON
+        _, dot, ext = name.rpartition(".")
+        if not dot:
+            return None
+        return _MEDIA_TYPES_BY_SUFFIX.get("." + ext.lower())
 
     @staticmethod
     def is_csv(file_summary: dict[str, Any]) -> bool:
@@ -410,7 +1185,7 @@ class ProvenanceCrate:
         Returns a pandas.DataFrame, or None if the file/path is not found.
         Raises ValueError if the file does not look like a CSV.
         """
-        import pandas as pd
+        pd = _get_pandas()
 
         ents = self.get_file_entities(file_selector)
         if not ents:
@@ -420,8 +1195,8 @@ class ProvenanceCrate:
         if not path:
             return None
 
-        summary = self._summarise_file(ent)
-        mt = self.guess_media_type(summary)
+        summary = self._file_summary[ent["@id"]]
+        mt = self._file_media_types[ent["@id"]]
         if mt not in ("text/csv", "text/comma-separated-values"):
             raise ValueError(f"{summary.get('name')} is not a CSV (mediaType={mt})")
 
@@ -442,184 +1217,180 @@ class ProvenanceCrate:
         - the inputs (files, datasets, parameters, other entities)
         - any `site_id` parameter value(s) associated with the step run
         """
-        results: list[dict[str, Any]] = []
         files = self.get_file_entities(file_selector)
+        if not files:
+            return []
+
+        results: list[dict[str, Any]] = []
+        actions_by_result = self.actions_by_result
+        lineage_entry = self._lineage_entry
 
         for f in files:
             fid = f["@id"]
-            producers = self.actions_by_result.get(fid, [])
+            producers = actions_by_result.get(fid, ())
 
             if not producers:
                 results.append(
                     {
-                        "file": self._summarise_file(f),
+                        "file": self._file_summary[fid],
                         "produced_by": None,
                         "site_ids": [],
-                        "note": "No CreateAction found that lists this file in its result.",
+                        "note": _NO_PRODUCER_NOTE,
                     }
                 )
                 continue
 
             for act_id in producers:
-                act = self.by_id[act_id]
-                inst = act.get("instrument")
-                inst_id = inst.get("@id") if isinstance(inst, dict) else inst
-                tool = self.by_id.get(inst_id) if inst_id else None
-
-                inputs = {"files": [], "datasets": [], "parameters": [], "other": []}
-
-                for obj in act.get("object", []):
-                    oid = obj.get("@id") if isinstance(obj, dict) else obj
-                    ent = self.by_id.get(oid)
-                    if not ent:
-                        continue
-                    if self._has_type(ent, "File"):
-                        inputs["files"].append(self._summarise_file(ent))
-                    elif self._has_type(ent, "Dataset"):
-                        inputs["datasets"].append(self._summarise_dataset(ent))
-                    elif self._has_type(ent, "PropertyValue"):
-                        inputs["parameters"].append(self._summarise_param(ent))
-                    else:
-                        inputs["other"].append(
-                            {
-                                "id": ent["@id"],
-                                "type": ent.get("@type"),
-                            }
-                        )
-
-                site_ids = [p["value"] for p in inputs["parameters"] if p.get("name") == "site_id"]
-
-                results.append(
-                    {
-                        "file": self._summarise_file(f),
-                        "produced_by": {
-                            "action": self._summarise_action(act),
-                            "tool": self._summarise_tool(tool),
-                            "inputs": inputs,
-                        },
-                        "site_ids": site_ids,
-                    }
-                )
+                results.append(lineage_entry(fid, act_id))
 
         return results
 
+    def _lineage_entry(self, fid: str, act_id: str) -> dict[str, Any]:
+        """Return the lineage summary of File `fid` as produced by action `act_id`."""
+        return {
+            "file": self._file_summary[fid],
+            "produced_by": {
+                "action": self._action_summary[act_id],
+                "tool": self._action_tool_summary[act_id],
+                "inputs": self._action_inputs[act_id].copy(),
+            },
+            "site_ids": list(self._action_site_ids[act_id]),
+        }
+
     def get_file_ancestry(
         self,
         file_selector: str,
-        max_depth: int | None = None,
+        max_depth: float | None = None,
     ) -> dict[str, Any]:
         """
         Build an upstream provenance subgraph for file(s) matching `file_selector`.
 
         This walks backwards through CreateActions:
         file/dataset -> (generated by) -> CreateAction -> (used) -> input file/dataset.
+
+        `max_depth` counts action hops. When it is None the walk stops at
+        `DEFAULT_MAX_DEPTH` and warns if anything was left out; pass
+        float("inf") for the whole upstream graph.
+
+        Results are memoised per resolved root ids and depth (up to
+        `CACHE_SIZE` entries) until the indexes are rebuilt. Each call
+        returns fresh containers and action records; the summaries and
+        edge records inside them are shared.
         """
+        result, truncated = self._file_ancestry(file_selector, max_depth)
+        if truncated:
+            _warn_truncated(self.DEFAULT_MAX_DEPTH)
+        return result
+
+    def _file_ancestry(
+        self, file_selector: str, max_depth: float | None
+    ) -> tuple[dict[str, Any], bool]:
+        """Return `get_file_ancestry`'s result and whether the default cap cut it short."""
         files = self.get_file_entities(file_selector)
         if not files:
-            return {"root_files": [], "entities": {}, "actions": {}, "edges": []}
+            return {"root_files": [], "entities": {}, "actions": {}, "edges": []}, False
 
         root_ids = [f["@id"] for f in files]
+        key = self._walk_key(root_ids, max_depth)
+        cached = self._ancestry_cache.get(key)
+        if cached is not None:
+            result, truncated = cached
+            return self._copy_result(result, ("actions",)), truncated
 
         entity_nodes: dict[str, dict[str, Any]] = {}
         action_nodes: dict[str, dict[str, Any]] = {}
         edges: list[dict[str, Any]] = []
-
-        q = deque()
-        visited_entities = set()
-        visited_actions = set()
-
-        for fid in root_ids:
-            q.append((fid, 0))
-
-        while q:
-            ent_id, depth = q.popleft()
-            if ent_id in visited_entities:
-                continue
-            visited_entities.add(ent_id)
-
-            ent = self.by_id.get(ent_id)
-            if not ent:
-                continue
-
-            # Only keep File/Dataset in entity_nodes
-            if self._has_type(ent, "File"):
-                entity_nodes[ent_id] = self._summarise_file(ent)
-            elif self._has_type(ent, "Dataset"):
-                entity_nodes[ent_id] = self._summarise_dataset(ent)
+        add_edge = edges.append
+
+        cut_short: list[bool] = []
+        # Records keep the read-only partitions; _copy_result copies them once
+        walk = self._walk_upstream(
+            root_ids, max_depth, lambda: cut_short.append(True), copy_records=False
+        )
+        for kind, record in walk:
+            if kind == "edge":
+                add_edge(record)
+            elif kind == "entity":
+                entity_nodes[record["id"]] = record
             else:
-                # Not a data artefact we care about for recursion
-                continue
+                action_nodes[record["action"]["id"]] = record
 
-            # Find the actions that generated this entity
-            for act_id in self.actions_by_result.get(ent_id, []):
-                act = self.by_id.get(act_id)
-                if not act:
-                    continue
-
-                # Always record generated edge
-                edges.append(
-                    {
-                        "type": "generated",
-                        "action": act_id,
-                        "entity": ent_id,
-                    }
-                )
-
-                if act_id in visited_actions:
-                    continue
-                visited_actions.add(act_id)
-
-                inst = act.get("instrument")
-                inst_id = inst.get("@id") if isinstance(inst, dict) else inst
-                tool = self.by_id.get(inst_id) if inst_id else None
-
-                inputs = {"files": [], "datasets": [], "parameters": [], "other": []}
-                for obj in act.get("object", []):
-                    oid = obj.get("@id") if isinstance(obj, dict) else obj
-                    ent2 = self.by_id.get(oid)
-                    if not ent2:
-                        continue
-                    if self._has_type(ent2, "File"):
-                        inputs["files"].append(self._summarise_file(ent2))
-                    elif self._has_type(ent2, "Dataset"):
-                        inputs["datasets"].append(self._summarise_dataset(ent2))
-                    elif self._has_type(ent2, "PropertyValue"):
-                        inputs["parameters"].append(self._summarise_param(ent2))
-                    else:
-                        inputs["other"].append(
-                            {
-                                "id": ent2["@id"],
-                                "type": ent2.get("@type"),
-                            }
-                        )
-
-                action_nodes[act_id] = {
-                    "action": self._summarise_action(act),
-                    "tool": self._summarise_tool(tool),
-                    "inputs": inputs,
-                }
-
-                # Recurse into file/dataset inputs
-                for f_in in inputs["files"]:
-                    in_id = f_in["id"]
-                    edges.append({"type": "used", "action": act_id, "entity": in_id})
-                    if max_depth is None or depth + 1 <= max_depth:
-                        q.append((in_id, depth + 1))
-
-                for d_in in inputs["datasets"]:
-                    in_id = d_in["id"]
-                    edges.append({"type": "used", "action": act_id, "entity": in_id})
-                    if max_depth is None or depth + 1 <= max_depth:
-                        q.append((in_id, depth + 1))
-
-        return {
-            "root_files": [self._summarise_file(f) for f in files],
+        result = {
+            "root_files": [self._file_summary[fid] for fid in root_ids],
             "entities": entity_nodes,
             "actions": action_nodes,
             "edges": edges,
         }
+        self._ancestry_cache[key] = (result, bool(cut_short))
+        return self._copy_result(result, ("actions",)), bool(cut_short)
+
+    def iter_ancestry(
+        self,
+        file_selector: str,
+        max_depth: float | None = None,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """
+        Lazily walk the upstream provenance of file(s) matching `file_selector`.
+
+        Yields the same records `get_file_ancestry` collects, as they are
+        discovered, so callers that only count or search the subgraph can
+        stop early without materialising it:
 
-    def get_site_artifacts(self, site_id: str) -> dict[str, Any]:
+        - ("entity", FileSummary | DatasetSummary)
+        - ("action", {"action": ..., "tool": ..., "inputs": ...})
+        - ("edge", {"type": "generated" | "used", "action": ..., "entity": ...})
+        """
+        root_ids = [f["@id"] for f in self.get_file_entities(file_selector)]
+        return self._walk_upstream(root_ids, max_depth)
+
+    def _walk_upstream(
+        self,
+        root_ids: list[str],
+        max_depth: float | None,
+        on_truncated: Callable[[], object] | None = None,
+        *,
+        copy_records: bool = True,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Breadth-first walk from `root_ids` back through generating actions."""
+        action_summary = self._action_summary
+        action_inputs = self._action_inputs
+        tool_summary = self._action_tool_summary
+
+        def action_record(act_id: str) -> dict[str, Any]:
+            record = {
+                "action": action_summary[act_id],
+                "tool": tool_summary[act_id],
+                "inputs": action_inputs[act_id],
+            }
+            return _copy_record(record) if copy_records else record
+
+        # Only the default cap reports truncation; by default with a warning
+        if max_depth is None:
+            max_depth = self.DEFAULT_MAX_DEPTH
+            if on_truncated is None:
+                on_truncated = partial(_warn_truncated, max_depth)
+        else:
+            on_truncated = None
+
+        if not self._walk_graph_ready:
+            self._build_walk_graph()
+        # Roots come from get_file_entities, so they are Files and need no check
+        return _walk_actions(
+            [self.id_to_iloc[rid] for rid in root_ids],
+            max_depth,
+            self._producers_iloc,
+            self._action_data_inputs,
+            self.iloc_to_id,
+            self._data_summary_iloc,
+            action_record,
+            self._producer_edges,
+            self._action_input_edges,
+            on_truncated,
+        )
+
+    def get_site_artifacts(
+        self, site_id: str, *, include_key_lineages: bool = True
+    ) -> dict[str, Any]:
         """
         Return a site-centric view of the crate for a given `site_id`.
 
@@ -628,66 +1399,41 @@ class ProvenanceCrate:
         - Datasets and Files whose `alternateName` contains the site_id
         - CreateActions whose inputs include a matching site_id PropertyValue
         - Key lineage summaries for important per-site outputs.
+
+        Pass `include_key_lineages=False` to skip the lineage lookups when
+        only the listings are needed; "key_lineages" is then empty.
+
+        Results are memoised per `site_id` like `get_file_ancestry`.
         """
-        vals = list(self.by_id.values())
+        key = (site_id, include_key_lineages)
+        cached = self._site_cache.get(key)
+        if cached is not None:
+            return self._copy_result(cached, ("step_runs", "key_lineages"))
+
+        by_id = self.by_id
 
         # 1. PropertyValue parameters for this site
-        params = [
-            self._summarise_param(e)
-            for e in vals
-            if self._has_type(e, "PropertyValue")
-            and e.get("name") == "site_id"
-            and e.get("value") == site_id
-        ]
+        params = [self._param_summary[pid] for pid in self._params_by_site_id.get(site_id, ())]
 
         # 2. Datasets mentioning this site_id
         site_datasets = [
-            self._summarise_dataset(e)
-            for e in vals
-            if self._has_type(e, "Dataset") and site_id in str(e.get("alternateName", ""))
+            self._dataset_summary[did] for did in self._ids_mentioning("Dataset", site_id)
         ]
 
         # 3. Files mentioning this site_id
-        site_files = [
-            self._summarise_file(e)
-            for e in vals
-            if self._has_type(e, "File") and site_id in str(e.get("alternateName", ""))
-        ]
+        site_files = [self._file_summary[fid] for fid in self._ids_mentioning("File", site_id)]
 
         # 4. Step runs tagged with this site_id
-        site_action_ids = set()
-        for act in self.actions:
-            for obj in act.get("object", []):
-                oid = obj.get("@id") if isinstance(obj, dict) else obj
-                ent = self.by_id.get(oid)
-                if (
-                    ent
-                    and self._has_type(ent, "PropertyValue")
-                    and ent.get("name") == "site_id"
-                    and ent.get("value") == site_id
-                ):
-                    site_action_ids.add(act["@id"])
-                    break
+        site_action_ids = self.actions_by_site_id.get(site_id, ())
 
         def summarise_run(act: dict[str, Any]) -> dict[str, Any]:
-            inst = act.get("instrument")
-            inst_id = inst.get("@id") if isinstance(inst, dict) else inst
-            tool = self.by_id.get(inst_id) if inst_id else None
-
-            sids: list[str] = []
-            for obj in act.get("object", []):
-                oid = obj.get("@id") if isinstance(obj, dict) else obj
-                ent = self.by_id.get(oid)
-                if ent and self._has_type(ent, "PropertyValue") and ent.get("name") == "site_id":
-                    sids.append(ent.get("value"))
-
             return {
-                "action": self._summarise_action(act),
-                "tool": self._summarise_tool(tool),
-                "site_ids": sids,
+                "action": self._action_summary[act["@id"]],
+                "tool": self._action_tool_summary[act["@id"]],
+                "site_ids": list(self._action_site_ids[act["@id"]]),
             }
 
-        step_runs = [summarise_run(self.by_id[aid]) for aid in sorted(site_action_ids)]
+        step_runs = [summarise_run(by_id[aid]) for aid in sorted(site_action_ids)]
 
         # 5. Key lineages for "important" per-site outputs
         key_base_names = [
@@ -700,14 +1446,22 @@ class ProvenanceCrate:
             f"linear_{site_id}.json",
         ]
 
+        # Only lineages produced by this site's step runs qualify, so check
+        # each matching file's producers against them (assume one per site)
+        site_action_set = set(site_action_ids)
         key_lineages: dict[str, Any] = {}
-        for base in key_base_names:
-            summaries = self.get_file_lineage(base)
-            site_summaries = [s for s in summaries if site_id in s.get("site_ids", [])]
-            if site_summaries:
-                key_lineages[base] = site_summaries[0]  # assume one per site
+        for base in key_base_names if site_action_set and include_key_lineages else ():
+            for f in self.get_file_entities(base):
+                fid = f["@id"]
+                act_id = next(
+                    (a for a in self.actions_by_result.get(fid, ()) if a in site_action_set),
+                    None,
+                )
+                if act_id is not None:
+                    key_lineages[base] = self._lineage_entry(fid, act_id)
+                    break
 
-        return {
+        result = {
             "site_id": site_id,
             "parameters": params,
             "datasets": site_datasets,
@@ -715,11 +1469,13 @@ class ProvenanceCrate:
             "step_runs": step_runs,
             "key_lineages": key_lineages,
         }
+        self._site_cache[key] = result
+        return self._copy_result(result, ("step_runs", "key_lineages"))
 
     def get_file_descendants(
         self,
         file_selector: str,
-        max_depth: int | None = None,
+        max_depth: float | None = None,
     ) -> dict[str, Any]:
         """
         Forward provenance: given a file (or dataset), find downstream
@@ -727,175 +1483,162 @@ class ProvenanceCrate:
 
         This walks forwards through CreateActions:
         file/dataset -> (used by) -> CreateAction -> (generated) -> output file/dataset.
+
+        `max_depth` behaves as in `get_file_ancestry`, including the
+        `DEFAULT_MAX_DEPTH` cap when it is None. Results are memoised
+        the same way.
         """
+        result, truncated = self._file_descendants(file_selector, max_depth)
+        if truncated:
+            _warn_truncated(self.DEFAULT_MAX_DEPTH)
+        return result
+
+    def _file_descendants(
+        self, file_selector: str, max_depth: float | None
+    ) -> tuple[dict[str, Any], bool]:
+        """Return `get_file_descendants`'s result and whether the default cap cut it short."""
         roots = self.get_file_entities(file_selector)
         if not roots:
-            return {
+            empty: dict[str, Any] = {
                 "root_files": [],
                 "entities": {},
                 "actions": {},
                 "edges": [],
                 "descendant_files": [],
             }
+            return empty, False
 
         root_ids = [r["@id"] for r in roots]
-        q = deque((rid, 0) for rid in root_ids)
+        key = self._walk_key(root_ids, max_depth)
+        cached = self._descendants_cache.get(key)
+        if cached is not None:
+            result, truncated = cached
+            return self._copy_result(result, ("actions",)), truncated
 
         entity_nodes: dict[str, dict[str, Any]] = {}
         action_nodes: dict[str, dict[str, Any]] = {}
         edges: list[dict[str, Any]] = []
-
-        visited_entities = set()
-        visited_actions = set()
-
-        while q:
-            ent_id, depth = q.popleft()
-            if ent_id in visited_entities:
-                continue
-            visited_entities.add(ent_id)
-
-            ent = self.by_id.get(ent_id)
-            if not ent:
-                continue
-
-            # Record File/Dataset entities (others we ignore for propagation)
-            if self._has_type(ent, "File"):
-                entity_nodes[ent_id] = self._summarise_file(ent)
-            elif self._has_type(ent, "Dataset"):
-                entity_nodes[ent_id] = self._summarise_dataset(ent)
+        add_edge = edges.append
+
+        cut_short: list[bool] = []
+        # Records keep the read-only partitions; _copy_result copies them once
+        walk = self._walk_downstream(
+            root_ids, max_depth, lambda: cut_short.append(True), copy_records=False
+        )
+        for kind, record in walk:
+            if kind == "edge":
+                add_edge(record)
+            elif kind == "entity":
+                entity_nodes[record["id"]] = record
             else:
-                # Not a data artefact; don't propagate further
-                continue
-
-            # For each action that USES this entity as input
-            for act_id in self.actions_by_input.get(ent_id, []):
-                act = self.by_id.get(act_id)
-                if not act:
-                    continue
-
-                # Edge: entity is used by this action
-                edges.append(
-                    {
-                        "type": "used",
-                        "action": act_id,
-                        "entity": ent_id,
-                    }
-                )
-
-                # If we've seen this action before, we don't need to reprocess its outputs
-                if act_id in visited_actions:
-                    continue
-                visited_actions.add(act_id)
-
-                inst = act.get("instrument")
-                inst_id = inst.get("@id") if isinstance(inst, dict) else inst
-                tool = self.by_id.get(inst_id) if inst_id else None
-
-                # Partition inputs
-                inputs = {"files": [], "datasets": [], "parameters": [], "other": []}
-                for obj in act.get("object", []):
-                    oid = obj.get("@id") if isinstance(obj, dict) else obj
-                    ent2 = self.by_id.get(oid)
-                    if not ent2:
-                        continue
-                    if self._has_type(ent2, "File"):
-                        inputs["files"].append(self._summarise_file(ent2))
-                    elif self._has_type(ent2, "Dataset"):
-                        inputs["datasets"].append(self._summarise_dataset(ent2))
-                    elif self._has_type(ent2, "PropertyValue"):
-                        inputs["parameters"].append(self._summarise_param(ent2))
-                    else:
-                        inputs["other"].append(
-                            {
-                                "id": ent2["@id"],
-                                "type": ent2.get("@type"),
-                            }
-                        )
-
-                # Partition outputs
-                outputs = {"files": [], "datasets": [], "other": []}
-                for res in act.get("result", []):
-                    oid = res.get("@id") if isinstance(res, dict) else res
-                    ent2 = self.by_id.get(oid)
-                    if not ent2:
-                        continue
-
-                    if self._has_type(ent2, "File"):
-                        fs = self._summarise_file(ent2)
-                        outputs["files"].append(fs)
-                        edges.append(
-                            {
-                                "type": "generated",
-                                "action": act_id,
-                                "entity": ent2["@id"],
-                            }
-                        )
-                        # Recurse forward
-                        if max_depth is None or depth + 1 <= max_depth:
-                            q.append((ent2["@id"], depth + 1))
-
-                    elif self._has_type(ent2, "Dataset"):
-                        ds = self._summarise_dataset(ent2)
-                        outputs["datasets"].append(ds)
-                        edges.append(
-                            {
-                                "type": "generated",
-                                "action": act_id,
-                                "entity": ent2["@id"],
-                            }
-                        )
-                        if max_depth is None or depth + 1 <= max_depth:
-                            q.append((ent2["@id"], depth + 1))
-
-                    else:
-                        outputs["other"].append(
-                            {
-                                "id": ent2["@id"],
-                                "type": ent2.get("@type"),
-                            }
-                        )
-                        # No recursion through non-data outputs
-
-                action_nodes[act_id] = {
-                    "action": self._summarise_action(act),
-                    "tool": self._summarise_tool(tool),
-                    "inputs": inputs,
-                    "outputs": outputs,
-                }
-
-        # Collect descendant files (exclude roots)
-        descendant_files: list[dict[str, Any]] = []
-        root_id_set = set(root_ids)
-        for eid, summary in entity_nodes.items():
-            if eid not in root_id_set and summary.get("sha1") is not None:
-                descendant_files.append(summary)
+                action_nodes[record["action"]["id"]] = record
+
+        # Collect descendant files (exclude roots). Most selectors match one
+        # or two roots, where scanning a tuple beats hashing every id.
+        exclude: Collection[str] = tuple(root_ids) if len(root_ids) <= 4 else set(root_ids)
+        descendant_files = [
+            summary
+            for eid, summary in entity_nodes.items()
+            if summary.get("sha1") is not None and eid not in exclude
+        ]
 
-        return {
-            "root_files": [self._summarise_file(r) for r in roots],
+        result = {
+            "root_files": [self._file_summary[rid] for rid in root_ids],
             "entities": entity_nodes,
             "actions": action_nodes,
             "edges": edges,
             "descendant_files": descendant_files,
         }
+        self._descendants_cache[key] = (result, bool(cut_short))
+        return self._copy_result(result, ("actions",)), bool(cut_short)
+
+    def iter_descendants(
+        self,
+        file_selector: str,
+        max_depth: float | None = None,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """
+        Lazily walk the downstream provenance of file(s) matching `file_selector`.
+
+        Yields ("entity", ...), ("action", ...) and ("edge", ...) records as
+        they are discovered; see `iter_ancestry`. Action records also carry
+        the action's partitioned "outputs".
+        """
+        root_ids = [r["@id"] for r in self.get_file_entities(file_selector)]
+        return self._walk_downstream(root_ids, max_depth)
+
+    def _walk_downstream(
+        self,
+        root_ids: list[str],
+        max_depth: float | None,
+        on_truncated: Callable[[], object] | None = None,
+        *,
+        copy_records: bool = True,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Breadth-first walk from `root_ids` forward through consuming actions."""
+        action_summary = self._action_summary
+        action_inputs = self._action_inputs
+        action_outputs = self._action_outputs
+        tool_summary = self._action_tool_summary
+
+        def action_record(act_id: str) -> dict[str, Any]:
+            record = {
+                "action": action_summary[act_id],
+                "tool": tool_summary[act_id],
+                "inputs": action_inputs[act_id],
+                "outputs": action_outputs[act_id],
+            }
+            return _copy_record(record) if copy_records else record
+
+        # Only the default cap reports truncation; by default with a warning
+        if max_depth is None:
+            max_depth = self.DEFAULT_MAX_DEPTH
+            if on_truncated is None:
+                on_truncated = partial(_warn_truncated, max_depth)
+        else:
+            on_truncated = None
+
+        if not self._walk_graph_ready:
+            self._build_walk_graph()
+        # Roots come from get_file_entities, so they are Files and need no check
+        return _walk_actions(
+            [self.id_to_iloc[rid] for rid in root_ids],
+            max_depth,
+            self._consumers_iloc,
+            self._action_data_outputs,
+            self.iloc_to_id,
+            self._data_summary_iloc,
+            action_record,
+            self._consumer_edges,
+            self._action_output_edges,
+            on_truncated,
+        )
 
     # ------------------------------------------------------------------
     # TOON integration helpers
     # ------------------------------------------------------------------
 
-    def _ensure_toon_available(self) -> None:
+    def _ensure_toon_available(self) -> Callable[..., str]:
         """
         Internal helper to assert that `toon_format` is installed.
 
+        Returns
+        -------
+        Callable
+            The `toon_format.encode` function.
+
         Raises
         ------
         RuntimeError
             If the `toon_format` package is not available.
         """
-        if toon_encode is None:
+        encode = _get_toon_encode()
+        if encode is None:
             raise RuntimeError(
                 "toon_format is not installed. Install with:\n"
                 "  pip install git+https://github.com/toon-format/toon-python.git"
             )
+        return encode
 
     def to_toon(self, value: Any, options: dict[str, Any] | None = None) -> str:
         """
@@ -904,14 +1647,14 @@ class ProvenanceCrate:
         This is a thin wrapper around `toon_format.encode`, mainly so that
         lineage/site/graph methods can re-use a consistent encoding setup.
         """
-        self._ensure_toon_available()
-        if options is None:
-            # Reasonable defaults for LLM prompts:
-            # - 2-space indent
-            # - comma delimiter
-            # - no length marker (keep it visually simple)
-            options = {"indent": 2, "delimiter": ",", "lengthMarker": ""}
-        return toon_encode(value, options)
+        encode = self._ensure_toon_available()
+        return encode(value, _DEFAULT_TOON_OPTIONS if options is None else options)
+
+    @staticmethod
+    def _toon_key(options: dict[str, Any] | None, *args: Any) -> tuple[Any, ...]:
+        """Key a `to_toon_*` call in `_toon_cache`; option values need not be hashable."""
+        opts = None if options is None else tuple(sorted((k, repr(v)) for k, v in options.items()))
+        return (*args, opts)
 
     def to_toon_file_lineage(
         self,
@@ -925,6 +1668,11 @@ class ProvenanceCrate:
 
         Wraps `get_file_lineage` and returns a compact TOON string.
         """
+        key = self._toon_key(options, "lineage", file_selector, single)
+        cached = self._toon_cache.get(key)
+        if cached is not None:
+            return cached
+
         lineages = self.get_file_lineage(file_selector)
 
         if single and len(lineages) == 1:
@@ -940,7 +1688,39 @@ class ProvenanceCrate:
                 "lineages": lineages,
             }
 
-        return self.to_toon(payload, options)
+        text = self.to_toon(payload, options)
+        self._toon_cache[key] = text
+        return text
+
+    def to_toon_many_file_lineages(
+        self,
+        file_selectors: Iterable[str],
+        *,
+        single: bool = True,
+        max_workers: int | None = 1,
+        options: dict[str, Any] | None = None,
+    ) -> list[str]:
+        """
+        Encode the direct lineage of several selectors into TOON.
+
+        Convenience batching over `to_toon_file_lineage`: results come back in
+        selector order and the first error is re-raised. The pure-Python
+        encoder holds the GIL, so `max_workers > 1` is not a speed-up; it only
+        helps with an encoder that releases the GIL.
+        """
+        self._ensure_toon_available()
+        if max_workers == 1:
+            return [
+                self.to_toon_file_lineage(sel, single=single, options=options)
+                for sel in file_selectors
+            ]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(
+                pool.map(
+                    lambda sel: self.to_toon_file_lineage(sel, single=single, options=options),
+                    file_selectors,
+                )
+            )
 
     def to_toon_site_summary(
         self,
@@ -955,111 +1735,142 @@ class ProvenanceCrate:
         Uses `get_site_artifacts` internally, but reshapes `key_lineages`
         into an array so TOON can tabularise repeated fields.
         """
+        key = self._toon_key(options, "site", site_id, include_all_files)
+        cached = self._toon_cache.get(key)
+        if cached is not None:
+            return cached
+
         summary = self.get_site_artifacts(site_id)
 
         # Reshape key_lineages: dict[basename -> LineageSummary]
         kl = summary.get("key_lineages", {})
-        key_lineages_list: list[dict[str, Any]] = []
-        for basename, lineage in kl.items():
-            key_lineages_list.append(
-                {
-                    "basename": basename,
-                    "lineage": lineage,
-                }
-            )
-
-        payload: dict[str, Any] = {
-            "type": "SiteSummary",
-            "site_id": site_id,
-            "key_lineages": key_lineages_list,
-        }
+        key_lineages_list = [
+            {"basename": basename, "lineage": lineage} for basename, lineage in kl.items()
+        ]
 
         if include_all_files:
-            payload["parameters"] = summary.get("parameters", [])
-            payload["datasets"] = summary.get("datasets", [])
-            payload["files"] = summary.get("files", [])
-            payload["step_runs"] = summary.get("step_runs", [])
+            payload: dict[str, Any] = {
+                "type": "SiteSummary",
+                "site_id": site_id,
+                "key_lineages": key_lineages_list,
+                "parameters": summary.get("parameters", []),
+                "datasets": summary.get("datasets", []),
+                "files": summary.get("files", []),
+                "step_runs": summary.get("step_runs", []),
+            }
+        else:
+            payload = {
+                "type": "SiteSummary",
+                "site_id": site_id,
+                "key_lineages": key_lineages_list,
+            }
 
-        return self.to_toon(payload, options)
+        text = self.to_toon(payload, options)
+        self._toon_cache[key] = text
+        return text
 
     def to_toon_file_ancestry(
         self,
         file_selector: str,
         *,
-        max_depth: int | None = None,
+        max_depth: float | None = None,
+        columnar: bool = False,
         options: dict[str, Any] | None = None,
     ) -> str:
         """
         Encode the upstream provenance DAG of a file into TOON.
 
         Wraps `get_file_ancestry`, reshaping dicts into arrays so TOON
-        can use tabular encoding.
+        can use tabular encoding. With `columnar=True` the entities are
+        encoded as one list per field instead of one row per entity.
         """
-        graph = self.get_file_ancestry(file_selector, max_depth=max_depth)
+        key = self._toon_key(
+            options, "ancestry", file_selector, self._depth_key(max_depth), columnar
+        )
+        # Cached with the truncation flag, so a hit warns like the walk does
+        cached = self._toon_cache.get(key)
+        if cached is not None:
+            text, truncated = cached
+            if truncated:
+                _warn_truncated(self.DEFAULT_MAX_DEPTH)
+            return text
+
+        graph, truncated = self._file_ancestry(file_selector, max_depth)
 
         entities_map = graph.get("entities", {})
         actions_map = graph.get("actions", {})
 
-        entities_list = list(entities_map.values())
-        actions_list: list[dict[str, Any]] = []
-        for aid, adata in actions_map.items():
-            actions_list.append(
-                {
-                    "id": aid,
-                    **adata,
-                }
-            )
+        entities: Any = _columns(entities_map.values()) if columnar else list(entities_map.values())
+        # ChainMap views avoid copying each action record; the encoder accepts any
+        # Mapping. It iterates the last map first, so "id" is still the leading column.
+        actions_list = [ChainMap(adata, {"id": aid}) for aid, adata in actions_map.items()]
 
         payload = {
             "type": "FileAncestry",
             "file_selector": file_selector,
             "root_files": graph.get("root_files", []),
-            "entities": entities_list,
+            "entities": entities,
             "actions": actions_list,
             "edges": graph.get("edges", []),
         }
 
-        return self.to_toon(payload, options)
+        text = self.to_toon(payload, options)
+        self._toon_cache[key] = (text, truncated)
+        if truncated:
+            _warn_truncated(self.DEFAULT_MAX_DEPTH)
+        return text
 
     def to_toon_file_descendants(
         self,
         file_selector: str,
         *,
-        max_depth: int | None = None,
+        max_depth: float | None = None,
+        columnar: bool = False,
         options: dict[str, Any] | None = None,
     ) -> str:
         """
         Encode the downstream provenance DAG of a file into TOON.
 
         Wraps `get_file_descendants`, reshaping dicts into arrays for
-        better TOON tabular encoding.
+        better TOON tabular encoding. `columnar` is as for
+        `to_toon_file_ancestry`.
         """
-        graph = self.get_file_descendants(file_selector, max_depth=max_depth)
+        key = self._toon_key(
+            options, "descendants", file_selector, self._depth_key(max_depth), columnar
+        )
+        # Cached with the truncation flag, so a hit warns like the walk does
+        cached = self._toon_cache.get(key)
+        if cached is not None:
+            text, truncated = cached
+            if truncated:
+                _warn_truncated(self.DEFAULT_MAX_DEPTH)
+            return text
+
+        graph, truncated = self._file_descendants(file_selector, max_depth)
 
         entities_map = graph.get("entities", {})
         actions_map = graph.get("actions", {})
 
-        entities_list = list(entities_map.values())
-        actions_list: list[dict[str, Any]] = []
-        for aid, adata in actions_map.items():
-            actions_list.append(
-                {
-                    "id": aid,
-                    **adata,
-                }
-            )
+        entities: Any = _columns(entities_map.values()) if columnar else list(entities_map.values())
+        # ChainMap views avoid copying each action record; the encoder accepts any
+        # Mapping. It iterates the last map first, so "id" is still the leading column.
+        actions_list = [ChainMap(adata, {"id": aid}) for aid, adata in actions_map.items()]
 
         payload = {
             "type": "FileDescendants",
             "file_selector": file_selector,
             "root_files": graph.get("root_files", []),
-            "entities": entities_list,
+            "entities": entities,
             "actions": actions_list,
             "edges": graph.get("edges", []),
             "descendant_files": graph.get("descendant_files", []),
         }
 
-        return self.to_toon(payload, options)
+        text = self.to_toon(payload, options)
+        self._toon_cache[key] = (text, truncated)
+        if truncated:
+            _warn_truncated(self.DEFAULT_MAX_DEPTH)
+        return text
 
 
 if __name__ == "__main__":
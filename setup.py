@@ -0,0 +1,31 @@
+"""
+Optional compiled build of provenance_context.
+
+All metadata lives in pyproject.toml; this file only exists so the module
+can be compiled with mypyc when explicitly requested:
+
+    PROVENANCE_CONTEXT_MYPYC=1 pip install --no-build-isolation .
+
+(mypy must be installed in the build environment.) Without the variable,
+or if mypyc is unavailable, the pure-Python package is built as usual.
+"""
+
+import os
+import warnings
+
+from setuptools import setup
+
+ext_modules = []
+if os.environ.get("PROVENANCE_CONTEXT_MYPYC") == "1":
+    try:
+        from mypyc.build import mypycify
+    except ImportError:
+        warnings.warn(
+            "PROVENANCE_CONTEXT_MYPYC=1 but mypyc is not installed; "
+            "building pure-Python provenance_context",
+            stacklevel=1,
+        )
+    else:
+        ext_modules = mypycify(["provenance_context/__init__.py"])
+
+setup(ext_modules=ext_modules)
@@ -1,4 +1,12 @@
-"""Pytest configuration and fixtures for provenance-context tests."""
+"""
+Pytest configuration and fixtures for provenance-context tests.
+
+The crate fixtures are function-scoped on purpose: several tests edit
+`crate.graph` and call `_build_indexes()`, write files into the crate
+directory, or check the per-instance query caches from a cold start.
+Building these small crates takes well under a millisecond, so sharing
+them across tests would save nothing measurable.
+"""
 
 import json
 
@@ -204,3 +212,34 @@ def site_crate_dir(tmp_path):
 def site_crate(site_crate_dir):
     """Load a ProvenanceCrate with site-specific data."""
     return ProvenanceCrate.from_dir(str(site_crate_dir))
+
+
+class FakeToonEncoder:
+    """
+    Stand-in for `toon_format.encode` that records every call.
+
+    Returns `render(value)`, `repr` unless a test swaps it out, so the
+    to_toon_* methods can be checked without toon_format installed.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.render = repr
+
+    def __call__(self, value, options):
+        self.calls.append((value, options))
+        return self.render(value)
+
+    @property
+    def payloads(self):
+        return [value for value, _ in self.calls]
+
+
+@pytest.fixture
+def fake_toon_encode(monkeypatch):
+    """Replace the TOON encoder with a recording `FakeToonEncoder`."""
+    import provenance_context
+
+    fake = FakeToonEncoder()
+    monkeypatch.setattr(provenance_context, "_toon_encode", fake)
+    return fake
@@ -1,5 +1,7 @@
 """Tests for crate loading functionality."""
 
+from collections.abc import Mapping
+
 import pytest
 
 from provenance_context import ProvenanceCrate
@@ -16,6 +18,18 @@ def test_crate_from_file(sample_crate_dir):
     assert len(crate.by_id) > 0
 
 
+@pytest.mark.parametrize("parser", ["orjson", "json"])
+def test_crate_from_file_with_each_parser(sample_crate_dir, monkeypatch, parser):
+    """Test that loading works with orjson and with the stdlib fallback."""
+    import provenance_context
+
+    loads = pytest.importorskip(parser).loads
+    monkeypatch.setattr(provenance_context, "_json_loads", loads)
+
+    crate = ProvenanceCrate.from_file(str(sample_crate_dir / "ro-crate-metadata.json"))
+    assert crate.get_file_entities("test_output.csv")
+
+
 def test_crate_from_dir(sample_crate_dir):
     """Test loading a crate from a directory."""
     crate = ProvenanceCrate.from_dir(str(sample_crate_dir))
@@ -45,8 +59,8 @@ def test_crate_builds_indexes(sample_crate):
     """Test that indexes are built correctly."""
     assert len(sample_crate.by_id) > 0
     assert isinstance(sample_crate.actions, list)
-    assert isinstance(sample_crate.actions_by_result, dict)
-    assert isinstance(sample_crate.actions_by_input, dict)
+    assert isinstance(sample_crate.actions_by_result, Mapping)
+    assert isinstance(sample_crate.actions_by_input, Mapping)
 
 
 def test_crate_actions_index(sample_crate):
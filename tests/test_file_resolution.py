@@ -116,6 +116,16 @@ def test_guess_media_type_image():
         assert media_type.startswith("image/")
 
 
+def test_guess_media_type_uses_last_extension():
+    """Test that only the final, case-insensitive extension is considered."""
+    guess = ProvenanceCrate.guess_media_type
+    assert guess({"name": "Transects.GEOJSON"}) == "application/geo+json"
+    assert guess({"name": "site.geo.json"}) == "application/json"
+    assert guess({"name": "archive.csv.gz"}) is None
+    assert guess({"name": "csv"}) is None
+    assert guess({"name": None}) is None
+
+
 def test_is_csv():
     """Test CSV file detection."""
     file_summary = {"name": "test.csv", "encodingFormat": "text/csv"}
@@ -155,6 +165,19 @@ def test_get_image_files(sample_crate):
     assert any("image" in str(img.get("encodingFormat", "")).lower() for img in images)
 
 
+def test_get_image_files_by_extension():
+    """Test that images without encodingFormat are found by extension."""
+    crate = ProvenanceCrate(
+        [
+            {"@id": "a.PNG", "@type": "File", "alternateName": "plots/a.PNG"},
+            {"@id": "b.csv", "@type": "File", "alternateName": "b.csv"},
+            {"@id": "c", "@type": "File", "encodingFormat": "image/tiff"},
+        ]
+    )
+
+    assert [img["id"] for img in crate.get_image_files()] == ["a.PNG", "c"]
+
+
 def test_open_as_bytes(sample_crate, sample_crate_dir):
     """Test opening a file as bytes."""
     entities = sample_crate.get_file_entities("test_output.csv")
@@ -220,3 +243,51 @@ def test_open_as_dataframe_invalid_type(sample_crate, sample_crate_dir):
 
     with pytest.raises(ValueError, match="not a CSV"):
         sample_crate.open_as_dataframe("test.json")
+
+
+def test_get_local_path_uses_cached_listing(sample_crate, sample_crate_dir):
+    """Test that local paths resolve from the cached listing until refreshed."""
+    late = {"@id": "./plots/late.png", "@type": "File", "alternateName": "plots/late.png"}
+    assert sample_crate.get_local_path(sample_crate.by_id["test_output.csv"]) is not None
+
+    # The listing was taken before the file existed
+    (sample_crate_dir / "plots").mkdir()
+    (sample_crate_dir / "plots" / "late.png").write_bytes(b"png")
+    assert sample_crate.get_local_path(late) is None
+
+    sample_crate.refresh_fs_index()
+    local_path = sample_crate.get_local_path(late)
+    assert local_path is not None
+    assert local_path.read_bytes() == b"png"
+
+
+def test_get_local_path_through_symlinked_dir(sample_crate, sample_crate_dir, tmp_path):
+    """Test that files under a symlinked subdirectory resolve, and link loops end."""
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "linked.csv").write_text("a,b\n")
+    # a/{l1,l2} -> b and b/{m1,m2} -> a link to each other
+    (sample_crate_dir / "a").mkdir()
+    (sample_crate_dir / "b").mkdir()
+    (sample_crate_dir / "a" / "x.csv").write_text("x\n")
+    try:
+        (sample_crate_dir / "shared").symlink_to(outside, target_is_directory=True)
+        (sample_crate_dir / "shared2").symlink_to(outside, target_is_directory=True)
+        (outside / "loop").symlink_to(outside, target_is_directory=True)
+        for link in ("l1", "l2"):
+            (sample_crate_dir / "a" / link).symlink_to("../b", target_is_directory=True)
+        for link in ("m1", "m2"):
+            (sample_crate_dir / "b" / link).symlink_to("../a", target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks not supported here")
+
+    for cid in ("shared/linked.csv", "shared2/linked.csv", "shared/loop/linked.csv"):
+        local_path = sample_crate.get_local_path({"@id": cid, "@type": "File"})
+        assert local_path is not None
+        assert local_path.read_text() == "a,b\n"
+
+    for cid in ("a/x.csv", "b/m1/x.csv", "a/l2/m2/x.csv"):
+        local_path = sample_crate.get_local_path({"@id": cid, "@type": "File"})
+        assert local_path is not None
+        assert local_path.read_text() == "x\n"
+    assert sample_crate.get_local_path({"@id": "a/l1/missing.csv", "@type": "File"}) is None
@@ -1,5 +1,9 @@
 """Tests for internal helper methods."""
 
+from collections.abc import Mapping
+
+import pytest
+
 from provenance_context import ProvenanceCrate
 
 
@@ -94,6 +98,8 @@ def test_summarise_tool():
     assert summary["name"] == "test-tool"
     assert "inputs" in summary
     assert "outputs" in summary
+    assert summary["inputs"] == ({"@id": "#input1"},)
+    assert summary["outputs"] == ({"@id": "#output1"},)
 
 
 def test_summarise_tool_none():
@@ -128,10 +134,12 @@ def test_build_indexes(sample_crate):
     # Verify actions are collected
     action_count = sum(1 for e in sample_crate.graph if sample_crate._has_type(e, "CreateAction"))
     assert len(sample_crate.actions) == action_count
+    assert sample_crate.count_by_type("CreateAction") == action_count
+    assert sample_crate.count_by_type("NoSuchType") == 0
 
     # Verify indexes are dictionaries
-    assert isinstance(sample_crate.actions_by_result, dict)
-    assert isinstance(sample_crate.actions_by_input, dict)
+    assert isinstance(sample_crate.actions_by_result, Mapping)
+    assert isinstance(sample_crate.actions_by_input, Mapping)
 
 
 def test_build_indexes_result_mapping(multi_file_crate):
@@ -154,3 +162,216 @@ def test_build_indexes_input_mapping(multi_file_crate):
             if obj_id:
                 assert obj_id in multi_file_crate.actions_by_input
                 assert action["@id"] in multi_file_crate.actions_by_input[obj_id]
+
+
+def test_actions_by_id(multi_file_crate):
+    """Test that actions_by_id resolves each CreateAction id to its entity."""
+    assert list(multi_file_crate.actions_by_id.values()) == multi_file_crate.actions
+    for action in multi_file_crate.actions:
+        assert multi_file_crate.actions_by_id[action["@id"]] is action
+
+
+def test_build_type_indexes(sample_crate):
+    """Test that @type sets and per-type buckets are built correctly."""
+    assert sample_crate.types_by_id["#action1"] == frozenset({"CreateAction", "Action"})
+    assert sample_crate.types_by_id["#input1"] == frozenset({"File"})
+
+    file_ids = sample_crate.ids_by_type["File"]
+    assert set(file_ids) == {"#input1", "test_output.csv", "site001_output.json"}
+    assert sample_crate.ids_by_type["CreateAction"] == ("#action1",)
+    assert "#action1" in sample_crate.ids_by_type["Action"]
+
+
+def test_find_files_by_altname_short_and_long_patterns(sample_crate):
+    """Test substring lookup via the trigram index and the short-pattern scan."""
+    long_match = sample_crate._find_files_by_altname("output.cs")
+    assert [f["@id"] for f in long_match] == ["test_output.csv"]
+
+    short_match = sample_crate._find_files_by_altname("cs")
+    assert {f["@id"] for f in short_match} == {"#input1", "test_output.csv"}
+
+    assert sample_crate._find_files_by_altname("") == [
+        sample_crate.by_id[fid] for fid in sample_crate.ids_by_type["File"]
+    ]
+
+
+def test_action_partitions(sample_crate):
+    """Test that CreateAction inputs/outputs are partitioned once at build time."""
+    inputs = sample_crate._action_inputs["#action1"]
+    assert [f["id"] for f in inputs["files"]] == ["#input1"]
+    assert [p["id"] for p in inputs["parameters"]] == ["#param1"]
+    assert inputs["datasets"] == () and inputs["other"] == ()
+
+    outputs = sample_crate._action_outputs["#action1"]
+    assert [f["id"] for f in outputs["files"]] == ["test_output.csv"]
+    assert "parameters" not in outputs
+
+    assert sample_crate._action_site_ids["#action1"] == ("site001",)
+    with pytest.raises(TypeError):
+        inputs["files"] = ()
+
+
+def test_integer_action_graph(multi_file_crate):
+    """Test that the integer adjacency mirrors the string-keyed indexes."""
+    crate = multi_file_crate
+    crate._build_walk_graph()
+    assert [crate.id_to_iloc[eid] for eid in crate.iloc_to_id] == list(range(len(crate.by_id)))
+
+    processed = crate.id_to_iloc["processed_data.csv"]
+    producers = tuple(crate.iloc_to_id[i] for i in crate._producers_iloc[processed])
+    consumers = tuple(crate.iloc_to_id[i] for i in crate._consumers_iloc[processed])
+    assert producers == crate.actions_by_result["processed_data.csv"]
+    assert consumers == crate.actions_by_input["processed_data.csv"]
+
+    action2 = crate.id_to_iloc["#action2"]
+    assert [crate.iloc_to_id[i] for i in crate._action_data_outputs[action2]] == [
+        "final_output.csv"
+    ]
+
+
+def test_indexes_are_read_only(sample_crate):
+    """Test that the derived indexes cannot be mutated in place."""
+    with pytest.raises(TypeError):
+        sample_crate.by_id["new"] = {}
+    with pytest.raises(TypeError):
+        sample_crate.actions_by_result["new"] = ()
+    assert all(isinstance(v, tuple) for v in sample_crate.actions_by_input.values())
+    assert all(isinstance(v, tuple) for v in sample_crate.ids_by_type.values())
+
+
+def test_index_ids_are_interned(sample_crate):
+    """Test that ids in the action indexes are the by_id key objects."""
+    keys = {eid: eid for eid in sample_crate.by_id}
+    for index in (sample_crate.actions_by_result, sample_crate.actions_by_input):
+        for eid, act_ids in index.items():
+            if eid in keys:
+                assert eid is keys[eid]
+            for act_id in act_ids:
+                assert act_id is keys[act_id]
+
+
+def test_walk_adjacency_only_covers_data_entities(sample_crate):
+    """Test that only File/Dataset entities are keyed in the walk adjacency."""
+    crate = sample_crate
+    crate._build_walk_graph()
+    assert crate._producers_iloc and crate._consumers_iloc
+    for index in (crate._producers_iloc, crate._consumers_iloc):
+        for ent_i in index:
+            tset = crate.types_by_id[crate.iloc_to_id[ent_i]]
+            assert "File" in tset or "Dataset" in tset
+    assert crate.actions_by_input  # parameters are still indexed by id
+
+
+def test_tool_by_action(sample_crate):
+    """Test that each CreateAction maps to its resolved instrument entity."""
+    for act in sample_crate.actions:
+        inst = act.get("instrument")
+        inst_id = inst.get("@id") if isinstance(inst, dict) else inst
+        assert sample_crate.tool_by_action[act["@id"]] is sample_crate.by_id.get(inst_id)
+
+
+def test_tool_summaries_shared_between_actions():
+    """Test that actions run by the same tool share one tool summary."""
+    crate = ProvenanceCrate(
+        [
+            {"@id": "#tool", "@type": "SoftwareApplication", "name": "tool"},
+            {"@id": "#a1", "@type": "CreateAction", "instrument": {"@id": "#tool"}},
+            {"@id": "#a2", "@type": "CreateAction", "instrument": "#tool"},
+            {"@id": "#a3", "@type": "CreateAction"},
+        ]
+    )
+
+    summary = crate._action_tool_summary["#a1"]
+    assert summary == ProvenanceCrate._summarise_tool(crate.by_id["#tool"])
+    assert crate._action_tool_summary["#a2"] is summary
+    assert crate._action_tool_summary["#a3"] is None
+
+
+def test_partition_kind_priority():
+    """Test that multi-typed refs land in the highest-priority bucket."""
+    crate = ProvenanceCrate(
+        [
+            {"@id": "fd", "@type": ["Dataset", "File"]},
+            {"@id": "dp", "@type": ["PropertyValue", "Dataset"]},
+            {"@id": "p", "@type": "PropertyValue", "name": "x", "value": 1},
+            {"@id": "#a", "@type": "CreateAction", "object": ["fd", "dp", "p"], "result": ["p"]},
+        ]
+    )
+
+    assert crate._kind_by_id == {"fd": "File", "dp": "Dataset", "p": "PropertyValue"}
+    inputs = crate._action_inputs["#a"]
+    assert [s["id"] for s in inputs["files"]] == ["fd"]
+    assert [s["id"] for s in inputs["datasets"]] == ["dp"]
+    assert [s["id"] for s in inputs["parameters"]] == ["p"]
+    assert crate._action_outputs["#a"]["other"] == ({"id": "p", "type": "PropertyValue"},)
+
+
+def test_edge_records_shared_between_walks(multi_file_crate):
+    """Test that ancestry and descendant walks reuse the same edge records."""
+    ancestry = multi_file_crate.get_file_ancestry("final_output.csv")
+    descendants = multi_file_crate.get_file_descendants("raw_data.csv")
+
+    shared = {(e["type"], e["action"], e["entity"]): e for e in descendants["edges"]}
+    common = [e for e in ancestry["edges"] if (e["type"], e["action"], e["entity"]) in shared]
+    assert common
+    for edge in common:
+        assert shared[edge["type"], edge["action"], edge["entity"]] is edge
+
+
+def test_columns_fills_missing_keys():
+    """Test that _columns unions row keys and pads missing values with None."""
+    from provenance_context import _columns
+
+    rows = [{"id": "a", "name": "x", "sha1": "h"}, {"id": "b", "name": "y"}]
+    assert _columns(rows) == {"id": ["a", "b"], "name": ["x", "y"], "sha1": ["h", None]}
+    assert _columns([]) == {}
+
+
+def test_is_type_uses_indexed_types(sample_crate):
+    """Test _is_type against the precomputed type sets."""
+    file_id = sample_crate.ids_by_type["File"][0]
+    assert sample_crate._is_type(file_id, "File")
+    assert not sample_crate._is_type(file_id, "CreateAction")
+    assert not sample_crate._is_type("not-in-crate", "File")
+
+
+def test_build_indexes_rejects_duplicate_ids():
+    """Test that two entities with the same @id are reported."""
+    graph = [
+        {"@id": "a.csv", "@type": "File"},
+        {"@id": "b.csv", "@type": "File"},
+        {"@id": "a.csv", "@type": "Dataset"},
+    ]
+    with pytest.raises(ValueError, match="a.csv"):
+        ProvenanceCrate(graph)
+
+
+def test_lru_cache_drops_least_recently_used():
+    """Test that _LRUCache evicts the entry read or written longest ago."""
+    from provenance_context import _LRUCache
+
+    cache = _LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_search_and_walk_indexes_built_on_first_use(multi_file_crate):
+    """Test that trigram and walk tables are left to the first query that needs them."""
+    crate = ProvenanceCrate(multi_file_crate.graph)
+    assert crate._altname_indexes == {}
+    assert not crate._walk_graph_ready
+
+    assert [f["@id"] for f in crate.get_file_entities("final_out")] == ["final_output.csv"]
+    assert "File" in crate._altname_indexes
+    crate.get_file_ancestry("final_output.csv")
+    assert crate._walk_graph_ready
+
+    crate._build_indexes()
+    assert crate._altname_indexes == {}
+    assert not crate._walk_graph_ready
@@ -1,5 +1,11 @@
 """Tests for lineage query functionality."""
 
+import warnings
+
+import pytest
+
+from provenance_context import ProvenanceCrate
+
 
 def test_get_file_lineage(sample_crate):
     """Test getting file lineage."""
@@ -36,6 +42,16 @@ def test_get_file_lineage_nonexistent(sample_crate):
     assert len(lineages) == 0
 
 
+def test_get_file_lineage_without_producer(multi_file_crate):
+    """Test that a file no action generates gets a note instead of produced_by."""
+    (lineage,) = multi_file_crate.get_file_lineage("raw_data.csv")
+
+    assert lineage["file"]["id"] == "raw_data.csv"
+    assert lineage["produced_by"] is None
+    assert lineage["site_ids"] == []
+    assert "No CreateAction" in lineage["note"]
+
+
 def test_get_file_ancestry(sample_crate):
     """Test getting file ancestry (upstream provenance)."""
     ancestry = sample_crate.get_file_ancestry("test_output.csv")
@@ -141,3 +157,243 @@ def test_descendants_includes_all_downstream(multi_file_crate):
     has_final = any("final" in name for name in file_names)
 
     assert has_processed or has_final
+
+
+def test_lineage_reuses_entity_summaries(multi_file_crate):
+    """Test that repeated queries share the precomputed entity summaries."""
+    first = multi_file_crate.get_file_lineage("processed_data.csv")[0]
+    ancestry = multi_file_crate.get_file_ancestry("final_output.csv")
+
+    assert ancestry["entities"]["processed_data.csv"] is first["file"]
+    assert first["produced_by"]["inputs"]["files"][0] is ancestry["entities"]["raw_data.csv"]
+
+
+def test_iter_ancestry_matches_get_file_ancestry(multi_file_crate):
+    """Test that the lazy ancestry walk yields the materialised records."""
+    records = list(multi_file_crate.iter_ancestry("final_output.csv"))
+    ancestry = multi_file_crate.get_file_ancestry("final_output.csv")
+
+    assert [r for k, r in records if k == "edge"] == ancestry["edges"]
+    assert {r["id"] for k, r in records if k == "entity"} == set(ancestry["entities"])
+    assert {r["action"]["id"] for k, r in records if k == "action"} == set(ancestry["actions"])
+
+
+def test_iter_descendants_can_stop_early(multi_file_crate):
+    """Test that the lazy descendants walk can be consumed partially."""
+    walk = multi_file_crate.iter_descendants("raw_data.csv")
+
+    kind, record = next(walk)
+    assert kind == "entity"
+    assert record["id"] == "raw_data.csv"
+    assert list(multi_file_crate.iter_descendants("nonexistent_file.csv")) == []
+
+
+def _chain_crate(n):
+    """Build a crate whose n Files form one chain: f0 -> #a1 -> f1 -> ... -> f{n-1}."""
+    graph = [{"@id": f"f{i}", "@type": "File", "alternateName": f"f{i}.csv"} for i in range(n)]
+    graph += [
+        {
+            "@id": f"#a{i}",
+            "@type": "CreateAction",
+            "object": [{"@id": f"f{i - 1}"}],
+            "result": [{"@id": f"f{i}"}],
+        }
+        for i in range(1, n)
+    ]
+    return ProvenanceCrate(graph)
+
+
+def test_ancestry_of_long_chain():
+    """Test that a long linear chain is walked fully and honours max_depth."""
+    n = 2000
+    crate = _chain_crate(n)
+
+    ancestry = crate.get_file_ancestry(f"f{n - 1}", max_depth=float("inf"))
+    assert len(ancestry["entities"]) == n
+    assert len(ancestry["actions"]) == n - 1
+
+    shallow = crate.get_file_ancestry(f"f{n - 1}", max_depth=3)
+    assert set(shallow["entities"]) == {f"f{i}" for i in range(n - 4, n)}
+
+    descendants = crate.get_file_descendants("f0", max_depth=float("inf"))
+    assert len(descendants["entities"]) == n
+
+    # Without max_depth the walk stops at DEFAULT_MAX_DEPTH and says so
+    with pytest.warns(RuntimeWarning, match="max_depth"):
+        capped = crate.get_file_ancestry(f"f{n - 1}")
+    assert len(capped["entities"]) == ProvenanceCrate.DEFAULT_MAX_DEPTH + 1
+
+
+def test_ancestry_of_diamond():
+    """Test that an input shared by several actions is reported once."""
+    graph = [
+        {"@id": f, "@type": "File", "alternateName": f}
+        for f in ("in.csv", "a.csv", "b.csv", "out.csv")
+    ]
+    graph += [
+        {
+            "@id": "#a",
+            "@type": "CreateAction",
+            "object": [{"@id": "in.csv"}],
+            "result": [{"@id": "a.csv"}],
+        },
+        {
+            "@id": "#b",
+            "@type": "CreateAction",
+            "object": [{"@id": "in.csv"}],
+            "result": [{"@id": "b.csv"}],
+        },
+        {
+            "@id": "#join",
+            "@type": "CreateAction",
+            "object": [{"@id": "a.csv"}, {"@id": "b.csv"}],
+            "result": [{"@id": "out.csv"}],
+        },
+    ]
+    crate = ProvenanceCrate(graph)
+
+    records = list(crate.iter_ancestry("out.csv"))
+    entity_ids = [rec["id"] for kind, rec in records if kind == "entity"]
+    assert entity_ids == ["out.csv", "a.csv", "b.csv", "in.csv"]
+
+    # Both edges into the shared input are still reported
+    edges = [rec for kind, rec in records if kind == "edge" and rec["entity"] == "in.csv"]
+    assert {e["action"] for e in edges} == {"#a", "#b"}
+
+
+def test_ancestry_results_are_memoised(multi_file_crate):
+    """Test that repeated walks reuse the cached result but return fresh containers."""
+    first = multi_file_crate.get_file_ancestry("final_output.csv")
+    first["entities"].clear()
+    second = multi_file_crate.get_file_ancestry("final_output.csv")
+
+    assert second["entities"]
+    assert second["edges"][0] is first["edges"][0]
+    assert multi_file_crate.get_file_descendants("raw_data.csv") == (
+        multi_file_crate.get_file_descendants("raw_data.csv")
+    )
+
+
+def test_memoised_action_records_are_copied(multi_file_crate):
+    """Test that editing a returned action record does not leak into the cache."""
+    first = multi_file_crate.get_file_ancestry("final_output.csv")
+    for record in first["actions"].values():
+        record["inputs"] = None
+    second = multi_file_crate.get_file_ancestry("final_output.csv")
+
+    assert all(record["inputs"] is not None for record in second["actions"].values())
+
+
+def test_lineage_records_do_not_share_index_state(sample_crate):
+    """Test that editing a lineage entry in place leaves later queries untouched."""
+    first = sample_crate.get_file_lineage("test_output.csv")[0]
+    first["site_ids"].append("bogus")
+    first["produced_by"]["inputs"]["files"] = ()
+
+    second = sample_crate.get_file_lineage("test_output.csv")[0]
+    assert second["site_ids"] == ["site001"]
+    assert [f["id"] for f in second["produced_by"]["inputs"]["files"]] == ["#input1"]
+    assert sample_crate.get_site_artifacts("site001")["step_runs"][0]["site_ids"] == ["site001"]
+
+
+def test_walk_cache_is_bounded(multi_file_crate, monkeypatch):
+    """Test that the walk memo keeps at most CACHE_SIZE results."""
+    monkeypatch.setattr(ProvenanceCrate, "CACHE_SIZE", 2)
+    crate = ProvenanceCrate(multi_file_crate.graph, str(multi_file_crate.root_dir))
+    for depth in range(5):
+        crate.get_file_ancestry("final_output.csv", max_depth=depth)
+
+    assert len(crate._ancestry_cache) == 2
+
+
+def test_walk_cache_cleared_on_rebuild(multi_file_crate):
+    """Test that rebuilding the indexes drops memoised walk results."""
+    before = multi_file_crate.get_file_descendants("raw_data.csv")
+    multi_file_crate.graph = [
+        e for e in multi_file_crate.graph if "CreateAction" not in str(e.get("@type"))
+    ]
+    multi_file_crate._build_indexes()
+
+    after = multi_file_crate.get_file_descendants("raw_data.csv")
+    assert len(before["entities"]) > 1
+    assert list(after["entities"]) == ["raw_data.csv"]
+
+
+def test_ancestry_depth_uses_shortest_path():
+    """Test that an entity reachable by a long and a short path is expanded at its shallowest depth."""
+    graph = [{"@id": f, "@type": "File", "alternateName": f} for f in ("src", "x", "a", "b", "out")]
+    graph += [
+        {
+            "@id": "#x",
+            "@type": "CreateAction",
+            "object": [{"@id": "src"}],
+            "result": [{"@id": "x"}],
+        },
+        {"@id": "#a", "@type": "CreateAction", "object": [{"@id": "x"}], "result": [{"@id": "a"}]},
+        {"@id": "#b", "@type": "CreateAction", "object": [{"@id": "a"}], "result": [{"@id": "b"}]},
+        # "x" is both three hops (via a, b) and one hop away from "out"
+        {
+            "@id": "#out",
+            "@type": "CreateAction",
+            "object": [{"@id": "b"}, {"@id": "x"}],
+            "result": [{"@id": "out"}],
+        },
+    ]
+    crate = ProvenanceCrate(graph)
+
+    ancestry = crate.get_file_ancestry("out", max_depth=2)
+    assert set(ancestry["entities"]) == {"out", "b", "x", "a", "src"}
+    assert "#x" in ancestry["actions"]
+
+
+def test_iter_descendants_expands_each_action_once():
+    """Test that an action consuming several walked files is expanded once."""
+    graph = [{"@id": f, "@type": "File", "alternateName": f} for f in ("in", "a", "b", "out")]
+    graph += [
+        {
+            "@id": "#split",
+            "@type": "CreateAction",
+            "object": [{"@id": "in"}],
+            "result": [{"@id": "a"}, {"@id": "b"}],
+        },
+        {
+            "@id": "#join",
+            "@type": "CreateAction",
+            "object": [{"@id": "a"}, {"@id": "b"}],
+            "result": [{"@id": "out"}],
+        },
+    ]
+    crate = ProvenanceCrate(graph)
+
+    records = list(crate.iter_descendants("in"))
+    actions = [rec["action"]["id"] for kind, rec in records if kind == "action"]
+    assert actions == ["#split", "#join"]
+    # Both input edges of the join are still reported
+    used = [rec["entity"] for kind, rec in records if kind == "edge" and rec["type"] == "used"]
+    assert used == ["in", "a", "b"]
+
+
+@pytest.mark.usefixtures("fake_toon_encode")
+def test_truncation_warning_points_at_caller(monkeypatch):
+    """Test that default-cap warnings are attributed to the calling code, every time."""
+    monkeypatch.setattr(ProvenanceCrate, "DEFAULT_MAX_DEPTH", 2)
+    first, second = _chain_crate(5), _chain_crate(6)
+
+    for call in (
+        lambda: first.get_file_ancestry("f4"),
+        lambda: first.get_file_ancestry("f4"),  # served from the walk cache
+        lambda: second.get_file_descendants("f0"),
+        lambda: list(second.iter_ancestry("f5")),
+        lambda: second.to_toon_file_ancestry("f5"),
+        lambda: second.to_toon_file_ancestry("f5"),  # served from the TOON cache
+        lambda: first.to_toon_file_descendants("f0"),
+        lambda: first.to_toon_file_descendants("f0"),
+    ):
+        with pytest.warns(RuntimeWarning, match="max_depth=2") as record:
+            call()
+        assert [w.filename for w in record] == [__file__]
+
+    # An explicit max_depth never warns
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        first.get_file_ancestry("f4", max_depth=2)
@@ -1,5 +1,7 @@
 """Tests for site artifacts functionality."""
 
+from provenance_context import ProvenanceCrate
+
 
 def test_get_site_artifacts(site_crate):
     """Test getting site artifacts."""
@@ -97,6 +99,16 @@ def test_site_artifacts_step_run_summary(site_crate):
         assert "id" in action or "name" in action
 
 
+def test_site_artifacts_share_lineage_summaries(site_crate):
+    """Test that site artifacts reuse the summaries lineage queries return."""
+    artifacts = site_crate.get_site_artifacts("site001")
+    run = artifacts["step_runs"][0]
+    lineage = site_crate.get_file_lineage(artifacts["files"][0]["id"])
+
+    assert lineage[0]["file"] is artifacts["files"][0]
+    assert site_crate._action_summary[run["action"]["id"]] is run["action"]
+
+
 def test_site_artifacts_files_by_name_pattern(site_crate):
     """Test that files are found by name pattern matching."""
     artifacts = site_crate.get_site_artifacts("site001")
@@ -107,3 +119,127 @@ def test_site_artifacts_files_by_name_pattern(site_crate):
         artifacts = site_crate.get_site_artifacts("site001")
         file_names = [f.get("name", "") for f in artifacts["files"]]
         assert any("site001" in name for name in file_names)
+
+
+def test_actions_by_site_id_index(site_crate):
+    """Test that actions are indexed by their site_id parameter values."""
+    assert site_crate.actions_by_site_id["site001"] == ("#action1",)
+    assert "nonexistent_site" not in site_crate.actions_by_site_id
+
+
+def test_params_by_site_id_index(site_crate):
+    """Test that site_id parameters are indexed by value."""
+    pids = site_crate._params_by_site_id["site001"]
+    assert pids
+    for pid in pids:
+        param = site_crate.by_id[pid]
+        assert param["name"] == "site_id"
+        assert param["value"] == "site001"
+
+
+def test_site_artifacts_key_lineages_pick_site_run():
+    """Test that key lineages come from the queried site's step run."""
+    graph = [
+        {"@id": "#p1", "@type": "PropertyValue", "name": "site_id", "value": "site001"},
+        {"@id": "#p2", "@type": "PropertyValue", "name": "site_id", "value": "site002"},
+        {
+            "@id": "#a1",
+            "@type": "CreateAction",
+            "object": [{"@id": "#p1"}],
+            "result": [{"@id": "t1"}],
+        },
+        {
+            "@id": "#a2",
+            "@type": "CreateAction",
+            "object": [{"@id": "#p2"}],
+            "result": [{"@id": "t2"}],
+        },
+        {"@id": "t1", "@type": "File", "alternateName": "site001/tides.csv"},
+        {"@id": "t2", "@type": "File", "alternateName": "site002/tides.csv"},
+    ]
+    crate = ProvenanceCrate(graph)
+
+    lineage = crate.get_site_artifacts("site002")["key_lineages"]["tides.csv"]
+    assert lineage["file"]["id"] == "t2"
+    assert lineage["produced_by"]["action"]["id"] == "#a2"
+    assert crate.get_site_artifacts("site003")["key_lineages"] == {}
+
+    # Opting out skips the lineages but keeps the listings
+    full = crate.get_site_artifacts("site002")
+    listing = crate.get_site_artifacts("site002", include_key_lineages=False)
+    assert listing["key_lineages"] == {}
+    assert {k: v for k, v in listing.items() if k != "key_lineages"} == {
+        k: v for k, v in full.items() if k != "key_lineages"
+    }
+
+
+def test_site_artifacts_match_names_in_crate_order():
+    """Test that site files/datasets are matched by substring, including non-string names."""
+    crate = ProvenanceCrate(
+        [
+            {"@id": "d1", "@type": "Dataset", "alternateName": "runs/nzd0003"},
+            {"@id": "f1", "@type": "File", "alternateName": ["nzd0003_a.csv", "alias"]},
+            {"@id": "f2", "@type": "File", "alternateName": "nzd0003/b.csv"},
+            {"@id": "f3", "@type": "File", "alternateName": "nzd0004/c.csv"},
+            {"@id": "d2", "@type": "Dataset", "alternateName": "runs/nzd0004"},
+        ]
+    )
+
+    artifacts = crate.get_site_artifacts("nzd0003")
+    assert [f["id"] for f in artifacts["files"]] == ["f1", "f2"]
+    assert [d["id"] for d in artifacts["datasets"]] == ["d1"]
+    assert [f["id"] for f in crate.get_site_artifacts("nzd")["files"]] == ["f1", "f2", "f3"]
+
+
+def test_site_artifacts_overlapping_site_ids():
+    """Test that a name containing several site ids is listed under each of them."""
+    crate = ProvenanceCrate(
+        [
+            {"@id": "f1", "@type": "File", "alternateName": "nzd0001/nzd00010.csv"},
+            {"@id": "f2", "@type": "File", "alternateName": "nzd00010/out.csv"},
+        ]
+    )
+
+    assert [f["id"] for f in crate.get_site_artifacts("nzd0001")["files"]] == ["f1", "f2"]
+    assert [f["id"] for f in crate.get_site_artifacts("nzd00010")["files"]] == ["f1", "f2"]
+
+
+def test_site_artifacts_are_memoised(site_crate):
+    """Test that repeated site queries reuse the cached result with fresh containers."""
+    first = site_crate.get_site_artifacts("site001")
+    first["files"].clear()
+    second = site_crate.get_site_artifacts("site001")
+
+    assert second["files"]
+    assert second["parameters"][0] is first["parameters"][0]
+
+    site_crate.graph = [e for e in site_crate.graph if e.get("@type") != "PropertyValue"]
+    site_crate._build_indexes()
+    assert site_crate.get_site_artifacts("site001")["parameters"] == []
+
+
+def test_memoised_site_records_are_copied():
+    """Test that editing returned step runs and key lineages does not leak into the cache."""
+    graph = [
+        {"@id": "#p1", "@type": "PropertyValue", "name": "site_id", "value": "site001"},
+        {
+            "@id": "#a1",
+            "@type": "CreateAction",
+            "object": [{"@id": "#p1"}],
+            "result": [{"@id": "t1"}],
+        },
+        {"@id": "t1", "@type": "File", "alternateName": "site001/tides.csv"},
+    ]
+    crate = ProvenanceCrate(graph)
+    first = crate.get_site_artifacts("site001")
+    first["step_runs"][0]["site_ids"].append("bogus")
+    first["key_lineages"]["tides.csv"]["site_ids"].append("bogus")
+    first["key_lineages"]["tides.csv"]["produced_by"]["inputs"]["files"] = ("bogus",)
+    first["key_lineages"]["tides.csv"]["produced_by"]["tool"] = "edited"
+
+    second = crate.get_site_artifacts("site001")
+    assert second["step_runs"][0]["site_ids"] == ["site001"]
+    assert second["key_lineages"]["tides.csv"]["site_ids"] == ["site001"]
+    assert second["key_lineages"]["tides.csv"]["produced_by"]["inputs"]["files"] == ()
+    assert second["key_lineages"]["tides.csv"]["produced_by"]["tool"] != "edited"
+    assert crate.get_file_lineage("t1")[0]["site_ids"] == ["site001"]
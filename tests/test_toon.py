@@ -2,6 +2,8 @@
 
 import pytest
 
+from provenance_context import ProvenanceCrate
+
 
 def test_to_toon_not_installed(sample_crate):
     """Test that TOON methods raise error when toon_format is not installed."""
@@ -114,3 +116,120 @@ def test_to_toon_ensure_available_error(sample_crate):
     # Just verify the method exists and can be called
     assert hasattr(sample_crate, "_ensure_toon_available")
     assert callable(sample_crate._ensure_toon_available)
+
+
+def test_to_toon_missing_encoder_is_remembered(sample_crate, monkeypatch):
+    """Test that a failed toon_format import is not retried on every call."""
+    import sys
+    import types
+
+    import provenance_context
+
+    monkeypatch.setattr(provenance_context, "_toon_encode", None)
+    monkeypatch.setattr(provenance_context, "_toon_missing", False)
+    monkeypatch.setitem(sys.modules, "toon_format", None)
+
+    with pytest.raises(RuntimeError, match="toon_format is not installed"):
+        sample_crate._ensure_toon_available()
+
+    # Making the module importable now has no effect: the miss is cached
+    fake = types.ModuleType("toon_format")
+    fake.encode = lambda value, options: "encoded"
+    monkeypatch.setitem(sys.modules, "toon_format", fake)
+    with pytest.raises(RuntimeError):
+        sample_crate.to_toon({"a": 1})
+
+
+def test_to_toon_uses_cached_encoder(sample_crate, fake_toon_encode):
+    """Test that to_toon goes through the lazily imported encoder."""
+    value = {"a": 1}
+    assert sample_crate.to_toon(value) == repr(value)
+    assert fake_toon_encode.calls == [
+        ({"a": 1}, {"indent": 2, "delimiter": ",", "lengthMarker": ""})
+    ]
+    # The value goes to the encoder as-is, with no JSON round trip
+    assert fake_toon_encode.payloads[0] is value
+
+
+def test_to_toon_methods_cache_results(sample_crate, fake_toon_encode):
+    """Test that repeated to_toon_* calls reuse the encoded string."""
+    calls = fake_toon_encode.calls
+    fake_toon_encode.render = lambda value: f"encoded-{len(calls)}"
+
+    first = sample_crate.to_toon_file_ancestry("test_output.csv", max_depth=2)
+    assert sample_crate.to_toon_file_ancestry("test_output.csv", max_depth=2) == first
+    assert sample_crate.to_toon_file_ancestry("test_output.csv", max_depth=1) != first
+    assert sample_crate.to_toon_file_ancestry("test_output.csv", max_depth=2, options={}) != first
+    assert [value["type"] for value in fake_toon_encode.payloads] == ["FileAncestry"] * 3
+
+    sample_crate._build_indexes()
+    assert sample_crate.to_toon_file_ancestry("test_output.csv", max_depth=2) != first
+    assert len(calls) == 4
+
+
+def test_to_toon_many_file_lineages(multi_file_crate, fake_toon_encode):
+    """Test that batch lineage encoding matches per-selector calls, in order."""
+    selectors = ["final_output.csv", "processed_data.csv", "raw_data.csv", "missing.csv"]
+    fresh = ProvenanceCrate(multi_file_crate.graph, str(multi_file_crate.root_dir))
+    expected = [fresh.to_toon_file_lineage(sel) for sel in selectors]
+
+    assert multi_file_crate.to_toon_many_file_lineages(selectors, max_workers=1) == expected
+
+    multi_file_crate._invalidate_caches()
+    assert multi_file_crate.to_toon_many_file_lineages(selectors, max_workers=4) == expected
+
+
+def test_to_toon_many_file_lineages_unknown_selector(multi_file_crate, fake_toon_encode):
+    """Test that an unknown selector encodes an empty lineage list."""
+    results = multi_file_crate.to_toon_many_file_lineages(["missing.csv"], max_workers=2)
+
+    expected = {"type": "FileLineageList", "file_selector": "missing.csv", "lineages": []}
+    assert results == [repr(expected)]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_to_toon_many_file_lineages_propagates_errors(
+    multi_file_crate, fake_toon_encode, max_workers
+):
+    """Test that an encoder failure on one selector is re-raised to the caller."""
+
+    def render(value):
+        if value["file_selector"] == "raw_data.csv":
+            raise ValueError("cannot encode")
+        return repr(value)
+
+    fake_toon_encode.render = render
+
+    with pytest.raises(ValueError, match="cannot encode"):
+        multi_file_crate.to_toon_many_file_lineages(
+            ["final_output.csv", "raw_data.csv"], max_workers=max_workers
+        )
+
+
+def test_to_toon_file_ancestry_columnar(multi_file_crate, fake_toon_encode):
+    """Test that columnar encoding passes entities as one list per field."""
+    multi_file_crate.to_toon_file_ancestry("final_output.csv")
+    multi_file_crate.to_toon_file_ancestry("final_output.csv", columnar=True)
+    rows, columns = (payload["entities"] for payload in fake_toon_encode.payloads)
+
+    assert columns["id"] == [row["id"] for row in rows]
+    assert columns["sha1"] == [row.get("sha1") for row in rows]
+
+
+def test_to_toon_ancestry_cache_follows_default_depth(
+    multi_file_crate, fake_toon_encode, monkeypatch
+):
+    """Test that cached TOON output is keyed on the effective default depth."""
+    fake_toon_encode.render = lambda value: repr(sorted(e["id"] for e in value["entities"]))
+    monkeypatch.setattr(ProvenanceCrate, "DEFAULT_MAX_DEPTH", 1)
+    with pytest.warns(RuntimeWarning):
+        shallow = multi_file_crate.to_toon_file_ancestry("final_output.csv")
+
+    monkeypatch.setattr(ProvenanceCrate, "DEFAULT_MAX_DEPTH", 50)
+    deep = multi_file_crate.to_toon_file_ancestry("final_output.csv")
+
+    assert deep != shallow
+    expected = sorted(
+        e["id"] for e in multi_file_crate.get_file_ancestry("final_output.csv")["entities"].values()
+    )
+    assert deep == repr(expected)